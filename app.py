@@ -6,20 +6,81 @@ Enhanced with ZIP file upload support
 
 import time
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import json
 import os
 import zipfile
 import tempfile
+import threading
 import shutil
 from pathlib import Path
 from typing import Dict, List, Any
 import re
 from datetime import datetime
-from bs4 import BeautifulSoup
+import importlib.util
 import io
 import hashlib
-import base64
-import traceback
+import hmac
+import html
+import secrets
+import binascii
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+# bs4 and lxml are imported lazily by extract_html_content, so home page reruns never load them;
+# only probe whether lxml is installed (optional: fall back to the pure-Python parser)
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# Set NJE_PARSER (e.g. "html.parser" or "html5lib") to override the parser for unusual HTML
+HTML_PARSER = os.environ.get("NJE_PARSER", HTML_PARSER)
+
+# Only the elements extract_html_content reads are built into the parse tree
+QUESTION_STRAINER_ARGS = (['div', 'li'], ['question', 'multi-choice-item', 'question-options', 'question-choices-container'])
+ANSWER_STRAINER_ARGS = ('div', ['answer', 'discussion-summary', 'ai-recommendation'])
+
+# Inline display:none styles; the strainer drops ancestors, so when one is present the
+# whole document is parsed and hidden wrappers can be removed. Ordinary CSS (a <style>
+# block, display:flex) keeps the strainer.
+HIDDEN_STYLE_RE = re.compile(r'style\s*=[^>]*display\s*:\s*none', re.IGNORECASE)
+HIDDEN_STYLE_BYTES_RE = re.compile(rb'style\s*=[^>]*display\s*:\s*none', re.IGNORECASE)
+
+# Substrings at least one of which must appear for the strainer to match anything:
+# every class in QUESTION_STRAINER_ARGS contains 'question' except 'multi-choice-item'
+QUESTION_CLASS_MARKERS = ('question', 'multi-choice-item')
+ANSWER_CLASS_MARKERS = ('answer', 'discussion-summary', 'ai-recommendation')
+
+# Common markers that indicate duplicate questions, checked in this order
+DUPLICATE_MARKERS = (
+    "You have the following",
+    "HOTSPOT -",
+    "DRAG DROP -",
+    "SIMULATION -",
+    "You need to",
+    "What should you",
+    "Hot Area:"
+)
+DUPLICATE_MARKER_RE = re.compile("|".join(re.escape(marker) for marker in DUPLICATE_MARKERS))
+
+# Matches a whole <img> tag in serialized HTML
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+
+# Matches the quoted src attribute of an <img> tag: (tag start, quote, value)
+IMG_SRC_RE = re.compile(r'(<img\b[^>]*?\ssrc\s*=\s*)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+# Question folder names: topic_<topic_index>_question_<question_index>
+FOLDER_NAME_RE = re.compile(r'topic_(\d+)_question_(\d+)')
+
+# Choice text with the letter inline: "A. text" (span-less format), or "A. text" / "A) text" / "A text" (fallback)
+CHOICE_DOTTED_RE = re.compile(r'^([A-Z])\.\\s*(.*)')
+CHOICE_LETTER_RE = re.compile(r'^([A-Z])[\.\)\s]\s*(.*)')
+
+# Inline options in the question text: A. text B. text C. text D. text
+INLINE_OPTION_RE = re.compile(r'\b([A-D])\.\s+([^\n]+?)(?=\s+[A-D]\.|$)', re.MULTILINE | re.DOTALL)
 
 
 
@@ -78,6 +139,44 @@ st.markdown("""
 DATA_DIR = Path("exam_data")
 DATA_DIR.mkdir(exist_ok=True)
 
+# Small summary of every exam so the home page doesn't load full exam data
+EXAM_INDEX_FILE = DATA_DIR / "index.json"
+
+# Password hashing: PBKDF2 cost is calibrated per host to keep unlocks responsive
+PASSWORD_HASH_SCHEME = "pbkdf2_sha256_peppered"
+UNPEPPERED_HASH_SCHEME = "pbkdf2_sha256"
+PASSWORD_HASH_TARGET_MS = 300
+PASSWORD_HASH_MIN_ITERATIONS = 100_000
+
+# Server-side pepper: from the environment, else generated once outside DATA_DIR
+PEPPER_ENV_VAR = "NOTJUSTEXAM_PEPPER"
+PEPPER_FILE = Path(".notjustexam_pepper")
+
+# Write buffer for generated offline HTML
+OFFLINE_HTML_BUFFER_SIZE = 128 * 1024
+
+# Offline downloads generated at once across all sessions; further clicks queue
+OFFLINE_EXPORT_WORKERS = 2
+
+# Base64 data URIs are about 4/3 the size of their image, and the render caches keep
+# them for the life of the process unless bounded. At most IMAGE_URI_CACHE_ENTRIES URIs
+# are held (about 25 MB for typical ~150 KB exam screenshots), and any entry unused
+# for RENDER_CACHE_TTL_SECONDS is dropped, so exams nobody is studying release theirs.
+RENDER_CACHE_TTL_SECONDS = 30 * 60
+IMAGE_URI_CACHE_ENTRIES = 128
+
+# Rendered answers embed their images too; 64 of them with a couple of screenshots
+# each stay around the same order of memory as the data URI cache
+ANSWER_HTML_CACHE_ENTRIES = 64
+
+# Minimum time an unlock attempt takes, whatever the outcome
+UNLOCK_MIN_SECONDS = 0.5
+
+# Uploaded ZIPs are spooled here; copies older than the max age belong to abandoned
+# sessions (Streamlit has no session-end hook) and are swept on the next upload
+UPLOAD_SPOOL_DIR = Path(tempfile.gettempdir()) / "notjustexam_uploads"
+UPLOAD_SPOOL_MAX_AGE_SECONDS = 6 * 60 * 60
+
 def initialize_session_state():
     """Initialize session state variables"""
     if "current_page" not in st.session_state:
@@ -86,12 +185,30 @@ def initialize_session_state():
         st.session_state.selected_exam = None
     if "current_question_index" not in st.session_state:
         st.session_state.current_question_index = 0
-    if "show_answer" not in st.session_state:
-        st.session_state.show_answer = {}
-    if "authenticated_exams" not in st.session_state:  # NEW
-        st.session_state.authenticated_exams = []
+    if not isinstance(st.session_state.get("show_answer"), set):
+        st.session_state.show_answer = set()
+    if not isinstance(st.session_state.get("authenticated_exams"), set):
+        st.session_state.authenticated_exams = set(st.session_state.get("authenticated_exams", ()))
     if "password_attempt" not in st.session_state:  # NEW
         st.session_state.password_attempt = {}
+    if "exam_table_version" not in st.session_state:
+        st.session_state.exam_table_version = 0
+
+
+def parse_json_bytes(data: bytes) -> Any:
+    """Parse JSON from raw bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json_bytes(data: Any, compact: bool = False) -> bytes:
+    """Serialize data to UTF-8 JSON bytes (indented unless compact), using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data) if compact else orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
 
 
 def get_question_folder_last_modified(exam_name: str, topic_index: int, question_index: int) -> str:
@@ -122,40 +239,166 @@ def get_question_folder_last_modified(exam_name: str, topic_index: int, question
     return datetime.fromtimestamp(latest_time).strftime('%Y-%m-%d %H:%M:%S')
 
 
+@st.cache_resource(show_spinner=False)
+def get_password_hash_iterations(target_ms: int = PASSWORD_HASH_TARGET_MS) -> int:
+    """Calibrate the PBKDF2 iteration count so one hash takes about target_ms on this host"""
+    iterations = 10_000
+    while True:
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibration", b"calibration-salt", iterations)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # Keep doubling until the sample is long enough to extrapolate from reliably
+        if elapsed_ms >= 25:
+            break
+        iterations *= 2
+
+    return max(PASSWORD_HASH_MIN_ITERATIONS, int(iterations * target_ms / elapsed_ms))
+
+@st.cache_resource(show_spinner=False)
+def get_password_pepper() -> bytes:
+    """
+    Load the secret pepper mixed into every password hash
+
+    Uses the NOTJUSTEXAM_PEPPER environment variable when set, otherwise a
+    random value generated on first use and kept in PEPPER_FILE. Changing the
+    pepper invalidates the passwords of exams created with the old one.
+    """
+    pepper = os.environ.get(PEPPER_ENV_VAR)
+    if pepper:
+        return pepper.encode()
+
+    try:
+        with open(PEPPER_FILE, 'xb') as f:
+            pepper = secrets.token_hex(32).encode()
+            f.write(pepper)
+            return pepper
+    except FileExistsError:
+        return PEPPER_FILE.read_bytes().strip()
+
+def pepper_password(password: str) -> bytes:
+    """Key the password with the server pepper before it is stretched"""
+    return hmac.new(get_password_pepper(), password.encode(), hashlib.sha256).digest()
+
 def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password using peppered, salted PBKDF2-SHA256 with a host-calibrated iteration count"""
+    iterations = get_password_hash_iterations()
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", pepper_password(password), salt, iterations)
+    return f"{PASSWORD_HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
 
 def verify_password(input_password: str, stored_hash: str) -> bool:
-    """Verify password against stored hash"""
-    return hash_password(input_password) == stored_hash
+    """Verify password against stored hash using a constant-time comparison
+
+    Supports peppered and unpeppered PBKDF2 hashes as well as the legacy
+    unsalted SHA-256 hex digests stored by older versions of the app.
+    """
+    if not stored_hash:
+        return False
+
+    scheme, sep, _ = stored_hash.partition("$")
+    if sep and scheme in (PASSWORD_HASH_SCHEME, UNPEPPERED_HASH_SCHEME):
+        if scheme == PASSWORD_HASH_SCHEME:
+            secret = pepper_password(input_password)
+        else:
+            secret = input_password.encode()
+        try:
+            _, iterations, salt, expected = stored_hash.split("$")
+            digest = hashlib.pbkdf2_hmac("sha256", secret, bytes.fromhex(salt), int(iterations))
+        except ValueError:
+            return False
+        return hmac.compare_digest(digest.hex().encode(), expected.encode())
+
+    legacy_hash = hashlib.sha256(input_password.encode()).hexdigest()
+    return hmac.compare_digest(legacy_hash.encode(), stored_hash.encode())
+
+@st.cache_resource(show_spinner=False)
+def get_password_executor() -> ThreadPoolExecutor:
+    """Shared worker pool that runs password verification off the script thread"""
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="password-hash")
 
 def is_exam_authenticated(exam_name: str) -> bool:
     """Check if exam is authenticated in current session"""
-    if "authenticated_exams" not in st.session_state:
-        st.session_state.authenticated_exams = []
-    return exam_name in st.session_state.authenticated_exams
+    return exam_name in st.session_state.get("authenticated_exams", ())
 
 def image_to_base64(image_path: str) -> str:
     """Convert image to base64 for embedding"""
     try:
-        if not Path(image_path).exists():
-            print(f"Warning: Image not found: {image_path}")
-            return ""
-        
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-            base64_data = base64.b64encode(image_data).decode('utf-8')
-            ext = Path(image_path).suffix.lower()
-            mime_types = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', 
-                         '.png': 'image/png', '.gif': 'image/gif'}
-            mime_type = mime_types.get(ext, 'image/jpeg')
-            return f"data:{mime_type};base64,{base64_data}"
+        return encode_image_data_uri(image_path, os.stat(image_path).st_mtime_ns)
+    except FileNotFoundError:
+        print(f"Warning: Image not found: {image_path}")
+        return ""
     except Exception as e:
         print(f"Error converting image {image_path}: {e}")
         return ""
 
 
+@st.cache_resource(max_entries=IMAGE_URI_CACHE_ENTRIES, ttl=RENDER_CACHE_TTL_SECONDS, show_spinner=False)
+def encode_image_data_uri(image_path: str, mtime_ns: int) -> str:
+    """Encode an image as a data URI once per modification time, shared by every question that references it"""
+    base64_data = binascii.b2a_base64(Path(image_path).read_bytes(), newline=False).decode('ascii')
+    ext = os.path.splitext(image_path)[1].lower()
+    if ext == '.png':
+        mime_type = 'image/png'
+    elif ext == '.gif':
+        mime_type = 'image/gif'
+    else:
+        mime_type = 'image/jpeg'
+    return f"data:{mime_type};base64,{base64_data}"
+
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def load_image_bytes(image_path: str, mtime_ns: int) -> bytes:
+    """Read an image file once per modification time and share the bytes across reruns"""
+    return Path(image_path).read_bytes()
+
+
+def list_exam_image_files(exam_name: str) -> Dict[str, str]:
+    """Map image filenames to paths for an exam, rescanning only when the images directory changes"""
+    images_dir = DATA_DIR / exam_name / "images"
+    try:
+        mtime_ns = images_dir.stat().st_mtime_ns
+    except OSError:
+        return {}
+    return scan_image_dir(str(images_dir), mtime_ns)
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def scan_image_dir(images_dir: str, mtime_ns: int) -> Dict[str, str]:
+    """List the files in an images directory once per directory modification time"""
+    with os.scandir(images_dir) as entries:
+        return {entry.name: entry.path for entry in entries if entry.is_file()}
+
+
+def resolve_image_path(image_files: Dict[str, str], src: str, folder_prefix: str = "") -> str:
+    """Find the saved image file an <img> src refers to, or None"""
+    # Try exact match first
+    img_path = image_files.get(src)
+    if img_path or not folder_prefix:
+        return img_path
+
+    # Try with the specific folder prefix for this question
+    img_path = image_files.get(f"{folder_prefix}_{src}")
+    if img_path:
+        return img_path
+
+    # Last resort: any image saved under another folder prefix
+    suffix = f"_{src}"
+    matching_files = [name for name in image_files if name.endswith(suffix)]
+    if not matching_files:
+        return None
+
+    # Prefer files with the correct folder prefix, else use first match
+    for match in matching_files:
+        if match.startswith(folder_prefix):
+            return image_files[match]
+    return image_files[matching_files[0]]
+
+
+def unescape_html(text: str) -> str:
+    """Decode HTML entities, skipping the work for the common case of text without any"""
+    return html.unescape(text) if '&' in text else text
+
+
 def convert_html_images_to_base64(html_content: str, exam_name: str, folder_prefix: str = "") -> str:
     """Convert all image src in HTML to base64 data URIs
     
@@ -164,53 +407,26 @@ def convert_html_images_to_base64(html_content: str, exam_name: str, folder_pref
         exam_name: Name of the exam
         folder_prefix: The folder prefix (e.g., 'topic_1_question_5') to find correct images
     """
-    if not html_content:
+    # Stored HTML is parser output with lowercase tags, so this skips image-free content
+    if not html_content or '<img' not in html_content:
         return html_content
     
-    # Parse without adding html/body wrapper tags
-    soup = BeautifulSoup(html_content, 'html.parser')
-    images = soup.find_all('img')
-    
-    for img in images:
-        src = img.get('src', '')
-        if src and not src.startswith('data:'):  # Skip if already base64
-            images_dir = DATA_DIR / exam_name / "images"
-            img_path = None
-            
-            # Try exact match first
-            test_path = images_dir / src
-            if test_path.exists():
-                img_path = test_path
-            elif folder_prefix:
-                # Try with the specific folder prefix for this question
-                prefixed_name = f"{folder_prefix}_{src}"
-                test_path = images_dir / prefixed_name
-                if test_path.exists():
-                    img_path = test_path
-                else:
-                    # Last resort: try glob pattern to find any match
-                    matching_files = list(images_dir.glob(f"*_{src}"))
-                    if matching_files:
-                        # Prefer files with the correct folder prefix
-                        for match in matching_files:
-                            if match.name.startswith(folder_prefix):
-                                img_path = match
-                                break
-                        # If no exact prefix match, use first match
-                        if not img_path:
-                            img_path = matching_files[0]
-            
-            if img_path and img_path.exists():
-                # Convert to base64
-                b64 = image_to_base64(str(img_path))
-                if b64:
-                    img['src'] = b64
-    
-    # Return decoded content to preserve original HTML structure
-    # Use decode_contents() for fragments or str() for complete documents
-    if hasattr(soup, 'decode_contents'):
-        return soup.decode_contents()
-    return str(soup)
+    image_files = list_exam_image_files(exam_name)
+
+    def embed(match):
+        # The regex sees raw attribute text, so decode entities like &amp; the way a parser would
+        src = unescape_html(match.group(3))
+        if not src or src.startswith('data:'):  # Skip if already base64
+            return match.group(0)
+
+        img_path = resolve_image_path(image_files, src, folder_prefix)
+        b64 = image_to_base64(img_path) if img_path else ""
+        if not b64:
+            return match.group(0)
+        return f"{match.group(1)}{match.group(2)}{b64}{match.group(2)}"
+
+    # Rewrite src attributes in place; the rest of the HTML is left untouched
+    return IMG_SRC_RE.sub(embed, html_content)
 
 
 def remove_duplicate_chunks(text: str, min_chunk_size: int = 150) -> str:
@@ -229,35 +445,18 @@ def remove_duplicate_chunks(text: str, min_chunk_size: int = 150) -> str:
         return text
     
     # METHOD 1: Find repeating question markers
-    # Common markers that indicate duplicate questions
-    markers = [
-        "You have the following",
-        "HOTSPOT -",
-        "DRAG DROP -",
-        "SIMULATION -",
-        "You need to",
-        "What should you",
-        "Hot Area:"
-    ]
-    
-    for marker in markers:
-        if marker not in text:
-            continue
-            
-        # Find all occurrences of this marker
-        positions = []
-        start = 0
-        while True:
-            pos = text.find(marker, start)
-            if pos == -1:
-                break
-            positions.append(pos)
-            start = pos + len(marker)
-        
+    # Collect every marker occurrence in a single scan
+    positions = {}
+    for match in DUPLICATE_MARKER_RE.finditer(text):
+        positions.setdefault(match.group(), []).append(match.start())
+
+    for marker in DUPLICATE_MARKERS:
+        marker_positions = positions.get(marker, ())
+
         # If we found 2+ occurrences, we likely have a duplicate
-        if len(positions) >= 2:
-            first_pos = positions[0]
-            second_pos = positions[1]
+        if len(marker_positions) >= 2:
+            first_pos = marker_positions[0]
+            second_pos = marker_positions[1]
             
             # Extract the chunk between first and second occurrence
             chunk_between = text[first_pos:second_pos].strip()
@@ -271,91 +470,111 @@ def remove_duplicate_chunks(text: str, min_chunk_size: int = 150) -> str:
     text_len = len(text)
     mid = text_len // 2
     
-    for offset in range(-50, 51):
-        split_point = mid + offset
-        if split_point < min_chunk_size or split_point > text_len - min_chunk_size:
-            continue
-        
-        first_half = text[:split_point].strip()
-        second_half = text[split_point:].strip()
-        
-        if first_half == second_half and len(first_half) >= min_chunk_size:
+    # A duplicated text is X + whitespace + X once stripped, so the whitespace
+    # run around the stripped text's centre is the only place the halves can
+    # split; one comparison replaces trying every split point near the middle
+    stripped = text.strip()
+    lead = len(text) - len(text.lstrip())
+    center = len(stripped) // 2
+    gap_start = gap_end = center
+    while gap_start > 0 and stripped[gap_start - 1].isspace():
+        gap_start -= 1
+    while gap_end < len(stripped) and stripped[gap_end].isspace():
+        gap_end += 1
+
+    first_half = stripped[:gap_start]
+    if len(first_half) >= min_chunk_size and first_half == stripped[gap_end:]:
+        # The split point must fall in the gap, within 50 of the middle and
+        # leave at least min_chunk_size characters on each side
+        lowest = max(lead + gap_start, mid - 50, min_chunk_size)
+        highest = min(lead + gap_end, mid + 50, text_len - min_chunk_size)
+        if lowest <= highest:
             return first_half
     
-    # METHOD 3: Sliding window for large duplicates
-    # Look for any large chunk that repeats
-    for chunk_size in range(int(text_len * 0.4), min_chunk_size, -30):
-        for start in range(0, min(200, text_len - chunk_size)):
-            chunk = text[start:start + chunk_size]
-            # Find if this chunk appears later
-            next_pos = text.find(chunk, start + chunk_size)
-            
-            if next_pos != -1 and (next_pos - start) >= min_chunk_size:
-                # Found duplicate - return text up to second occurrence
-                return text[:next_pos].strip()
-    
+    # METHOD 3: Find the largest chunk near the start that repeats later
+    # Chunk sizes step down by 30 from 40% of the text; the largest repeat wins,
+    # then the earliest start, then the earliest later occurrence
+    chunk_sizes = list(range(int(text_len * 0.4), min_chunk_size, -30))
+    if not chunk_sizes:
+        return text
+
+    # Every repeat contains a repeat of the smallest chunk, so only positions
+    # where that occurs need to be extended (avoids re-scanning for each size)
+    smallest = chunk_sizes[-1]
+    best_size, best_pos = 0, -1
+    for start in range(0, min(200, text_len - smallest)):
+        anchor = text[start:start + smallest]
+        next_pos = text.find(anchor, start + smallest)
+        while next_pos != -1:
+            # Binary search the largest chunk size that still repeats here without
+            # overlapping; the smallest size always does, since the anchor matched
+            limit = min(next_pos - start, text_len - start - 1)
+            lo, hi = 0, len(chunk_sizes) - 1
+            while lo < hi:
+                mid = (lo + hi) // 2
+                size = chunk_sizes[mid]
+                if size <= limit and text.startswith(text[start:start + size], next_pos):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            if chunk_sizes[lo] > best_size:
+                best_size, best_pos = chunk_sizes[lo], next_pos
+            next_pos = text.find(anchor, next_pos + 1)
+        if best_size == chunk_sizes[0]:
+            break
+
+    if best_pos != -1:
+        # Found duplicate - return text up to second occurrence
+        return text[:best_pos].strip()
+
     return text
 
 
 
-def generate_offline_html(exam_name: str, exam_data: Dict[str, Any], last_updated: str = None) -> str:
-    """Generate self-contained HTML file for offline study with proper formatting"""
-    
-    questions = exam_data["questions"]
-    exam_title = exam_data.get("exam_name", exam_name)
-    count = len(questions)
-    
-    # If last_updated not provided, try to get it
-    # if last_updated is None:
-    #     last_updated = get_folder_last_modified(exam_name)
-    
-    html = f'''<!DOCTYPE html>
-<html><head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>{exam_title} - Offline Study</title>
-<style>
-*{{margin:0;padding:0;box-sizing:border-box}}
-body{{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f5f7fa;padding:8px;line-height:1.6}}
-.container{{max-width:900px;margin:0 auto;background:white;border-radius:12px;box-shadow:0 4px 12px rgba(0,0,0,0.08)}}
-.header{{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:white;padding:24px;text-align:center;border-radius:12px 12px 0 0}}
-.header h1{{font-size:26px;margin-bottom:8px}}
-.nav{{background:#f8f9fa;padding:16px;display:flex;justify-content:space-between;align-items:center;gap:12px;position:sticky;top:0;z-index:100;flex-wrap:wrap}}
-.btn{{padding:10px 18px;border:none;border-radius:8px;cursor:pointer;font-size:15px;font-weight:500;min-width:44px;min-height:44px}}
-.btn-primary{{background:#667eea;color:white}}
-.btn-secondary{{background:#6c757d;color:white}}
-.btn:hover{{opacity:0.9}}
-.btn:disabled{{opacity:0.5;cursor:not-allowed}}
-.progress-bar{{height:4px;background:linear-gradient(90deg,#667eea 0%,#764ba2 100%);transition:width 0.3s}}
-.question{{padding:24px}}
-.question h3{{color:#667eea;margin-bottom:16px;font-size:20px}}
-.question-text{{margin:16px 0;line-height:1.8;color:#2c3e50}}
-.question-text p{{margin:12px 0}}
-.question-text ul{{margin:12px 0 12px 24px;padding:0}}
-.question-text li{{margin:8px 0;line-height:1.7}}
-.option{{padding:14px;margin:12px 0;border:2px solid #e9ecef;border-radius:10px;cursor:pointer;transition:all 0.2s}}
-.option:hover{{border-color:#667eea;background:#f8f9ff}}
-.option.correct{{border-color:#28a745;background:#d4edda}}
-.option.wrong{{border-color:#dc3545;background:#f8d7da}}
-.answer{{margin-top:24px;padding:20px;background:#f8f9fa;border-radius:10px;border-left:4px solid #667eea}}
-.answer h4{{color:#28a745;margin-bottom:16px}}
-.answer-content{{margin:16px 0;padding:16px;background:white;border-radius:8px}}
-.answer-content h5{{color:#2c3e50;margin-bottom:12px;font-size:16px}}
-.answer-content p{{margin:10px 0;line-height:1.7}}
-.answer-content ul{{margin:12px 0 12px 24px}}
-.answer-content li{{margin:8px 0;line-height:1.7}}
-.hidden{{display:none}}
-img{{max-width:100%;height:auto;margin:16px 0;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.1)}}
-select{{padding:10px 12px;border:2px solid #e9ecef;border-radius:8px;font-size:15px;background:white;cursor:pointer;min-width:100px}}
-select:focus{{outline:none;border-color:#667eea}}
-@media (max-width:768px){{
-body{{padding:4px}}
-.header h1{{font-size:22px}}
-.question{{padding:16px}}
-.btn{{font-size:14px;padding:10px 14px}}
-#counter{{width:100%;order:-1;margin-bottom:8px;text-align:center}}
-}}
-.question-meta {{
+# Static parts of the offline page, encoded once at import; generate_offline_html only
+# formats the title, question count and storage key around them
+OFFLINE_HTML_STYLE = '''<style>
+*{margin:0;padding:0;box-sizing:border-box}
+body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:#f5f7fa;padding:8px;line-height:1.6}
+.container{max-width:900px;margin:0 auto;background:white;border-radius:12px;box-shadow:0 4px 12px rgba(0,0,0,0.08)}
+.header{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:white;padding:24px;text-align:center;border-radius:12px 12px 0 0}
+.header h1{font-size:26px;margin-bottom:8px}
+.nav{background:#f8f9fa;padding:16px;display:flex;justify-content:space-between;align-items:center;gap:12px;position:sticky;top:0;z-index:100;flex-wrap:wrap}
+.btn{padding:10px 18px;border:none;border-radius:8px;cursor:pointer;font-size:15px;font-weight:500;min-width:44px;min-height:44px}
+.btn-primary{background:#667eea;color:white}
+.btn-secondary{background:#6c757d;color:white}
+.btn:hover{opacity:0.9}
+.btn:disabled{opacity:0.5;cursor:not-allowed}
+.progress-bar{height:4px;background:linear-gradient(90deg,#667eea 0%,#764ba2 100%);transition:width 0.3s}
+.question{padding:24px}
+.question h3{color:#667eea;margin-bottom:16px;font-size:20px}
+.question-text{margin:16px 0;line-height:1.8;color:#2c3e50}
+.question-text p{margin:12px 0}
+.question-text ul{margin:12px 0 12px 24px;padding:0}
+.question-text li{margin:8px 0;line-height:1.7}
+.option{padding:14px;margin:12px 0;border:2px solid #e9ecef;border-radius:10px;cursor:pointer;transition:all 0.2s}
+.option:hover{border-color:#667eea;background:#f8f9ff}
+.option.correct{border-color:#28a745;background:#d4edda}
+.option.wrong{border-color:#dc3545;background:#f8d7da}
+.answer{margin-top:24px;padding:20px;background:#f8f9fa;border-radius:10px;border-left:4px solid #667eea}
+.answer h4{color:#28a745;margin-bottom:16px}
+.answer-content{margin:16px 0;padding:16px;background:white;border-radius:8px}
+.answer-content h5{color:#2c3e50;margin-bottom:12px;font-size:16px}
+.answer-content p{margin:10px 0;line-height:1.7}
+.answer-content ul{margin:12px 0 12px 24px}
+.answer-content li{margin:8px 0;line-height:1.7}
+.hidden{display:none}
+img{max-width:100%;height:auto;margin:16px 0;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.1)}
+select{padding:10px 12px;border:2px solid #e9ecef;border-radius:8px;font-size:15px;background:white;cursor:pointer;min-width:100px}
+select:focus{outline:none;border-color:#667eea}
+@media (max-width:768px){
+body{padding:4px}
+.header h1{font-size:22px}
+.question{padding:16px}
+.btn{font-size:14px;padding:10px 14px}
+#counter{width:100%;order:-1;margin-bottom:8px;text-align:center}
+}
+.question-meta {
     background: #f8f9fa;
     padding: 8px 12px;
     margin-bottom: 16px;
@@ -367,172 +586,87 @@ body{{padding:4px}}
     align-items: center;
     flex-wrap: wrap;
     gap: 8px;
-}}
+}
 
-.last-updated-badge {{
+.last-updated-badge {
     background: #e3f2fd;
     padding: 4px 10px;
     border-radius: 4px;
     color: #1976d2;
     font-size: 12px;
     white-space: nowrap;
-}}
+}
 
-@media (max-width: 768px) {{
-    .question-meta {{
+@media (max-width: 768px) {
+    .question-meta {
         font-size: 12px;
-    }}
+    }
     
-    .last-updated-badge {{
+    .last-updated-badge {
         font-size: 11px;
         padding: 3px 8px;
-    }}
-}}
+    }
+}
 </style>
-</head>
-<body>
-<div class="container">
-<div class="header"><h1>📚 {exam_title}</h1><div>{count} Questions | Offline Mode</div>
-</div>
-<div class="nav">
-<button class="btn btn-secondary" onclick="prev()" id="prev">◀ Prev</button>
-<select id="qselect" class="btn" onchange="jump(this.value)"></select>
-<div id="counter">Q 1/{count}</div>
-<button class="btn btn-secondary" onclick="next()" id="next">Next ▶</button>
-<button class="btn btn-primary" onclick="toggle()" id="show">Show Answer</button>
-</div>
-<div style="height:4px;background:#e9ecef"><div class="progress-bar" id="prog" style="width:0%"></div></div>
-<div id="qs">'''
-    
-    # Add questions
-    for i, q in enumerate(questions):
-        topic = q.get('topic_index', 1)
-        qnum = q.get('question_index', 1)
-        text = q.get('question', 'No question')
-        last_updated = q.get("last_updated", "Unknown")
-        choices = q.get('choices', {})
-        
-        # Get the correct answer - handle both suggested_answer and correct_answer
-        ans = q.get('suggested_answer', q.get('correct_answer', []))
-        
-        # Remove duplicate chunks (if text was accidentally duplicated)
-        text = remove_duplicate_chunks(text, min_chunk_size=100)
-        formatted_text = text.replace('\n', '<br>')
-
-        # Build choices with corrected comparison logic
-        opts = ""
-        if choices:
-            for letter, choice in sorted(choices.items()):
-                # Normalize the choice letter for comparison
-                letter_normalized = str(letter).strip().upper()
-                
-                if letter_normalized:
-                    # Simple, robust comparison: normalized letter matches normalized answer
-                    is_correct = letter_normalized[0] in ans
-                else:
-                    is_correct = False
-                correct_str = "true" if is_correct else "false"
-                
-                # Use original letter for display, normalized for data attribute
-                opts += f'<div class="option" data-opt="{letter}" data-cor="{correct_str}" onclick="sel(this,{i})"><b>{letter}.</b> {choice}</div>'
-        
-        # Embed question images
-        imgs = ""
-        for img_file in q.get('saved_images', []):
-            img_path = DATA_DIR / exam_name / "images" / img_file
-            if img_path.exists():
-                b64 = image_to_base64(str(img_path))
-                if b64:
-                    imgs += f'<img src="{b64}">'
-        
-        # Embed answer images
-        answer_imgs = ""
-        if q.get('answer_images'):
-            for img_file in q['answer_images']:
-                img_path = DATA_DIR / exam_name / "images" / img_file
-                if img_path.exists():
-                    b64 = image_to_base64(str(img_path))
-                    if b64:
-                        answer_imgs += f'<img src="{b64}">'
-        
-        answer_html = q.get('suggested_answer_html', '')
-        disc_html = q.get('discussion_summary_html', '')
-        ai_html = q.get('ai_recommendation_html', '')
-
-        html += f'''
-<div class="question" id="q{i}" style="display:{'block' if i==0 else 'none'}">
-<h3>Topic {topic} - Question {qnum}</h3>
-            <div class="question-meta">
-                <span>Question {i+1} of {count}</span>
-                <span class="last-updated-badge">📅 Updated: {last_updated}</span>
-            </div>
-<div class="question-text">{formatted_text}</div>
-{imgs}
-<div>{opts}</div>
-<div class="answer hidden" id="a{i}">'''
-        
-        if answer_html:
-            soup = BeautifulSoup(answer_html, 'html.parser')
-            for img_tag in soup.find_all('img'):
-                img_tag.decompose()
-            answer_html = str(soup).replace("Suggested Answer:", "")
-            html += f'<div class="answer-content"><h5>✅ Suggested Answer</h5><div style="padding:10px">{answer_imgs}{answer_html}</div></div>'
-        else:
-            html += f'<h4>✅ Answer: {ans}</h4>'
-
-        if disc_html:
-            html += f'<div class="answer-content"><h5>💬 Discussion</h5><div style="padding:10px">{disc_html}</div></div>'
-        if ai_html:
-            html += f'<div class="answer-content"><h5>🤖 AI Recommendation</h5><div style="padding:10px">{ai_html}</div></div>'
-
-        html += '</div>\n</div>\n'
-
-    # Add JavaScript with improved sel() function
-    html += f'''
-</div></div>
-<script>
-let c=0,t={count},ans={{}},s=false;
-function load(){{
-let d=localStorage.getItem('e_{exam_name.replace(" ","_")}');
-if(d){{let p=JSON.parse(d);ans=p.a||{{}};c=p.c||0}}
+'''.encode('utf-8')
+
+OFFLINE_HTML_SCRIPT = '''function load(){
+let d=localStorage.getItem(KEY);
+if(d){let p=JSON.parse(d);ans=p.a||{};c=p.c||0}
 populateSelect();
 show(c);
-}}
-function populateSelect(){{
+}
+function populateSelect(){
 let sel=document.getElementById('qselect');
-for(let i=0;i<t;i++){{
+for(let i=0;i<t;i++){
 let opt=document.createElement('option');
 opt.value=i;
 opt.text='Q '+(i+1);
 sel.appendChild(opt);
-}}
-}}
-function jump(idx){{
+}
+}
+function jump(idx){
 show(parseInt(idx));
-}}
-function save(){{localStorage.setItem('e_{exam_name.replace(" ","_")}',JSON.stringify({{c:c,a:ans}}))}}
-function show(i){{
-document.querySelectorAll('.question').forEach(q=>q.style.display='none');
-let qElem=document.getElementById('q'+i);
-if(qElem)qElem.style.display='block';
+}
+function save(){localStorage.setItem(KEY,JSON.stringify({c:c,a:ans}))}
+function imgs(list){return (list||[]).map(id=>`<img src="${IMG[id]}">`).join('')}
+function section(title,body){return body?`<div class="answer-content"><h5>${title}</h5><div style="padding:10px">${body}</div></div>`:''}
+function render(i){
+let q=Q[i];
+let opts=(q.opts||[]).map(o=>`<div class="option" data-opt="${o[0]}" data-cor="${o[2]}" onclick="sel(this,${i})"><b>${o[0]}.</b> ${o[1]}</div>`).join('');
+let answer=q.answer?section('✅ Suggested Answer',imgs(q.answer_imgs)+q.answer):`<h4>✅ Answer: ${q.ans}</h4>`;
+document.getElementById('qs').innerHTML=`<div class="question" id="q${i}">
+<h3>Topic ${q.topic} - Question ${q.qnum}</h3>
+<div class="question-meta"><span>Question ${i+1} of ${t}</span><span class="last-updated-badge">📅 Updated: ${q.updated}</span></div>
+<div class="question-text">${q.text}</div>
+${imgs(q.imgs)}
+<div>${opts}</div>
+<div class="answer hidden" id="a${i}">${answer}${section('💬 Discussion',q.disc)}${section('🤖 AI Recommendation',q.ai)}</div>
+</div>`;
+// Restore the saved selection for this question
+let picked=[...document.querySelectorAll('#qs .option')].find(o=>o.getAttribute('data-opt')===ans[i]);
+if(picked)mark(picked);
+}
+function show(i){
+render(i);
 document.getElementById('counter').textContent='Q '+(i+1)+'/'+t;
 document.getElementById('qselect').value=i;
 document.getElementById('prev').disabled=i===0;
 document.getElementById('next').disabled=i===t-1;
 document.getElementById('prog').style.width=((i+1)/t*100)+'%';
-s=false;document.getElementById('a'+i).classList.add('hidden');
+s=false;
 document.getElementById('show').textContent='Show Answer';
 c=i;save();
-}}
-function next(){{if(c<t-1)show(c+1)}}
-function prev(){{if(c>0)show(c-1)}}
-function toggle(){{
+}
+function next(){if(c<t-1)show(c+1)}
+function prev(){if(c>0)show(c-1)}
+function toggle(){
 let a=document.getElementById('a'+c),b=document.getElementById('show');
-if(s){{a.classList.add('hidden');b.textContent='Show Answer'}}
-else{{a.classList.remove('hidden');b.textContent='Hide Answer'}}
+if(s){a.classList.add('hidden');b.textContent='Show Answer'}
+else{a.classList.remove('hidden');b.textContent='Hide Answer'}
 s=!s;
-}}
-function sel(e,q){{
+}
+function mark(e){
 // Clear all previous styling
 e.parentElement.querySelectorAll('.option').forEach(o=>o.classList.remove('correct','wrong'));
 // Check if selected option is correct
@@ -540,65 +674,251 @@ let cor=e.getAttribute('data-cor')==='true';
 // Apply correct styling to clicked option
 e.classList.add(cor?'correct':'wrong');
 // If wrong, also highlight the correct answer
-if(!cor){{
+if(!cor){
 let trueOpt=e.parentElement.querySelector('[data-cor="true"]');
 if(trueOpt)trueOpt.classList.add('correct');
-}}
+}
+}
+function sel(e,q){
+mark(e);
 // Save user's selection
 ans[q]=e.getAttribute('data-opt');
 save();
 // Auto-show answer explanation after 500ms
-setTimeout(()=>{{if(!s)toggle()}},500);
-}}
-document.addEventListener('keydown',e=>{{
+setTimeout(()=>{if(!s)toggle()},500);
+}
+document.addEventListener('keydown',e=>{
 if(e.key==='ArrowRight')next();
 else if(e.key==='ArrowLeft')prev();
-else if(e.key===' '){{e.preventDefault();toggle()}}
-}});
+else if(e.key===' '){e.preventDefault();toggle()}
+});
 window.onload=load;
 </script>
-</body></html>'''
+</body></html>'''.encode('utf-8')
+
+def generate_offline_html(exam_name: str, exam_data: Dict[str, Any], last_updated: str = None,
+                          image_dir: str = None) -> bytes:
+    """
+    Generate self-contained HTML file for offline study, as UTF-8 bytes ready for download
+
+    With image_dir set, images are linked as relative files under that folder
+    instead of being embedded as base64 data URIs (used by the ZIP download).
+    """
+    
+    questions = exam_data["questions"]
+    exam_title = exam_data.get("exam_name", exam_name)
+    count = len(questions)
+    
+    # If last_updated not provided, try to get it
+    # if last_updated is None:
+    #     last_updated = get_folder_last_modified(exam_name)
+    
+    # Encode each section into one buffered output instead of building a combined str first
+    out = io.BufferedWriter(io.BytesIO(), buffer_size=OFFLINE_HTML_BUFFER_SIZE)
+    out.write(f'''<!DOCTYPE html>
+<html><head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{exam_title} - Offline Study</title>
+'''.encode('utf-8'))
+    out.write(OFFLINE_HTML_STYLE)
+    out.write(f'''</head>
+<body>
+<div class="container">
+<div class="header"><h1>📚 {exam_title}</h1><div>{count} Questions | Offline Mode</div>
+</div>
+<div class="nav">
+<button class="btn btn-secondary" onclick="prev()" id="prev">◀ Prev</button>
+<select id="qselect" class="btn" onchange="jump(this.value)"></select>
+<div id="counter">Q 1/{count}</div>
+<button class="btn btn-secondary" onclick="next()" id="next">Next ▶</button>
+<button class="btn btn-primary" onclick="toggle()" id="show">Show Answer</button>
+</div>
+<div style="height:4px;background:#e9ecef"><div class="progress-bar" id="prog" style="width:0%"></div></div>
+<div id="qs">'''.encode('utf-8'))
+    
+    # Collect question data; the page renders one question at a time from this payload
+    image_files = list_exam_image_files(exam_name)
+
+    # Each image's data URI is emitted once in IMG; questions refer to it by index
+    image_ids = {}
+    image_uris = []
+
+    def embed_images(img_files) -> List[int]:
+        ids = []
+        for img_file in img_files:
+            if img_file not in image_ids:
+                img_path = image_files.get(img_file)
+                if not img_path:
+                    uri = ""
+                elif image_dir:
+                    uri = f"{image_dir}/{quote(img_file)}"
+                else:
+                    uri = image_to_base64(img_path)
+                image_ids[img_file] = len(image_uris) if uri else None
+                if uri:
+                    image_uris.append(uri)
+            if image_ids[img_file] is not None:
+                ids.append(image_ids[img_file])
+        return ids
+
+    payload = []
+    for q in questions:
+        choices = q.get('choices', {})
+        
+        # Get the correct answer - handle both suggested_answer and correct_answer
+        ans = q.get('suggested_answer', q.get('correct_answer', []))
+        
+        # Remove duplicate chunks (if text was accidentally duplicated)
+        text = remove_duplicate_chunks(q.get('question', 'No question'), min_chunk_size=100)
+
+        record = {
+            'topic': q.get('topic_index', 1),
+            'qnum': q.get('question_index', 1),
+            'updated': q.get("last_updated", "Unknown"),
+            'text': text.replace('\n', '<br>'),
+            'ans': str(ans),
+        }
+
+        # Fast path for text-only questions: the page defaults every missing field
+        if not (choices or q.get('saved_images') or q.get('answer_images') or q.get('suggested_answer_html')
+                or q.get('discussion_summary_html') or q.get('ai_recommendation_html')):
+            payload.append(record)
+            continue
+
+        # Choices as [letter, text, is_correct] with corrected comparison logic
+        opts = []
+        for letter, choice in sorted(choices.items()):
+            # Normalize the choice letter for comparison
+            letter_normalized = str(letter).strip().upper()
+            
+            # Simple, robust comparison: normalized letter matches normalized answer
+            is_correct = bool(letter_normalized) and letter_normalized[0] in ans
+            opts.append([letter, choice, is_correct])
+        
+        # Embed question and answer images
+        imgs = embed_images(q.get('saved_images', []))
+        answer_imgs = embed_images(q.get('answer_images') or [])
+        
+        answer_html = q.get('suggested_answer_html', '')
+        if answer_html:
+            # Answer images are embedded separately above; stored HTML is parser output, so a regex strip is safe
+            answer_html = IMG_TAG_RE.sub('', answer_html).replace("Suggested Answer:", "")
+
+        record.update({
+            'imgs': imgs,
+            'opts': opts,
+            'answer': answer_html,
+            'answer_imgs': answer_imgs,
+            'disc': q.get('discussion_summary_html', ''),
+            'ai': q.get('ai_recommendation_html', ''),
+        })
+        payload.append(record)
+
+    # Escape '<' so question HTML can't close or comment out the script element
+    payload_json = dump_json_bytes(payload, compact=True).replace(b'<', b'\\u003c')
+    images_json = dump_json_bytes(image_uris, compact=True)
+
+    # Data goes straight into the output as serialized bytes
+    out.write(b'\n</div></div>\n<script>\nconst IMG=')
+    out.write(images_json)
+    out.write(b';\nconst Q=')
+    out.write(payload_json)
+
+    # Only the counters and storage key vary per exam; the script body is a precompiled constant
+    storage_key = dump_json_bytes('e_' + exam_name.replace(' ', '_')).replace(b'<', b'\\u003c')
+    out.write(f';\nlet c=0,t={count},ans={{}},s=false;\nconst KEY='.encode('utf-8'))
+    out.write(storage_key)
+    out.write(b';\n')
+    out.write(OFFLINE_HTML_SCRIPT)
     
-    return html
+    out.flush()
+    return out.detach().getvalue()
+
+
+
+
+@st.cache_data(max_entries=4, ttl=RENDER_CACHE_TTL_SECONDS, show_spinner=False)
+def offline_html_cached(exam_name: str, mtime_ns: int) -> bytes:
+    """
+    Generate an exam's offline HTML once per version of its data file
+
+    Each page embeds every image of its exam, so unused pages expire like the
+    other render caches instead of staying in memory for the life of the process.
+    """
+    return generate_offline_html(exam_name, load_exam_cached(exam_name, mtime_ns))
+
+
+def generate_offline_zip(exam_name: str, exam_data: Dict[str, Any]) -> bytes:
+    """Package the offline page with its images as separate files in a ZIP archive"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        # The page is text and compresses well; images are already compressed, so they are stored as-is
+        zf.writestr("index.html", generate_offline_html(exam_name, exam_data, image_dir="images"),
+                    compress_type=zipfile.ZIP_DEFLATED)
+        for name, img_path in list_exam_image_files(exam_name).items():
+            zf.write(img_path, f"images/{name}", compress_type=zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def offline_zip_cached(exam_name: str, mtime_ns: int) -> bytes:
+    """Generate an exam's offline ZIP once per version of its data file"""
+    return generate_offline_zip(exam_name, load_exam_cached(exam_name, mtime_ns))
 
 
+@st.cache_resource(show_spinner=False)
+def get_offline_executor() -> ThreadPoolExecutor:
+    """Shared worker pool that bounds how many offline downloads are generated concurrently"""
+    return ThreadPoolExecutor(max_workers=OFFLINE_EXPORT_WORKERS, thread_name_prefix="offline-export")
 
 
 def download_exam_handler(exam_name: str):
-    """Handle offline download for home page"""
-    exam_data = load_exam(exam_name)
-    if not exam_data:
+    """
+    Render the offline download buttons for the home page
+
+    The HTML (or ZIP) is only generated when the user actually clicks its
+    button, and is cached until the exam file changes. Streamlit runs the data
+    callable off the script thread; the shared pool also caps how many exports
+    run at once when several users click together.
+    """
+    try:
+        mtime_ns = (DATA_DIR / exam_name / "exam_data.json").stat().st_mtime_ns
+    except OSError:
         st.error("Exam not found")
         return
-    
-    try:
-        # Get last modified time
-        # last_updated = get_folder_last_modified(exam_name)
 
-        html = generate_offline_html(exam_name, exam_data)
-        filename = f"{exam_name.replace(' ', '_')}_offline.html"
-        
-        st.download_button(
-            label="💾 Click to Download",
-            data=html,
-            file_name=filename,
-            mime="text/html",
-            key=f"dl_{exam_name}",
-            help="Download for offline study"
-        )
-        st.success("✅ Ready to download!")
-        st.info("📱 Works on all devices - mobile, tablet, desktop")
-    except Exception as e:
-        st.error(f"Error: {str(e)}")
-        st.error("**Full Stack Trace:**")
-        st.code(traceback.format_exc(), language="python")
+    # Check protection against the exam data itself, not the index the caller used
+    if load_exam_cached(exam_name, mtime_ns).get('password_protected') and not is_exam_authenticated(exam_name):
+        return
+
+    st.download_button(
+        label="📥 Download Offline",
+        data=lambda: get_offline_executor().submit(offline_html_cached, exam_name, mtime_ns).result(),
+        file_name=f"{exam_name.replace(' ', '_')}_offline.html",
+        mime="text/html",
+        key=f"download_{exam_key_id(exam_name)}",
+        help="Download for offline study - works on all devices",
+        on_click="ignore",
+        use_container_width=True
+    )
+    st.download_button(
+        label="📦 Download ZIP",
+        data=lambda: get_offline_executor().submit(offline_zip_cached, exam_name, mtime_ns).result(),
+        file_name=f"{exam_name.replace(' ', '_')}_offline.zip",
+        mime="application/zip",
+        key=f"download_zip_{exam_key_id(exam_name)}",
+        help="Page and images as separate files - smaller than the single HTML for image-heavy exams",
+        on_click="ignore",
+        use_container_width=True
+    )
 
 
 
 def parse_folder_name(folder_name: str) -> Dict[str, int]:
     """Extract topic and question index from folder name"""
     # Format: topic_<topic_index>_question_<question_index>
-    match = re.match(r'topic_(\d+)_question_(\d+)', folder_name)
+    match = FOLDER_NAME_RE.match(folder_name)
     if match:
         return {
             'topic_index': int(match.group(1)),
@@ -606,9 +926,37 @@ def parse_folder_name(folder_name: str) -> Dict[str, int]:
         }
     return None
 
-def extract_html_content(html_content: str, content_type: str) -> Dict[str, Any]:
-    """Extract content from HTML files using BeautifulSoup with support for multiple choice formats"""
-    soup = BeautifulSoup(html_content, 'html.parser')
+@st.cache_resource
+def get_html_strainer(is_question: bool):
+    """Build the SoupStrainer for question or answer files on first use"""
+    from bs4 import SoupStrainer
+
+    names, classes = QUESTION_STRAINER_ARGS if is_question else ANSWER_STRAINER_ARGS
+    classes = frozenset(classes)
+    # The strainer can see the raw attribute ("multi-choice-item correct-hidden") before
+    # it is split into classes, so match on the individual class names ourselves
+    return SoupStrainer(names, class_=lambda value: isinstance(value, str) and not classes.isdisjoint(value.split()))
+
+def extract_html_content(html_content, content_type: str) -> Dict[str, Any]:
+    """Extract content from HTML files using BeautifulSoup with support for multiple choice formats
+
+    Accepts str or UTF-8 bytes; bytes skip the parser's encoding detection.
+    """
+    is_question = content_type == 'question'
+    is_bytes = isinstance(html_content, bytes)
+
+    # Skip parsing entirely when none of the target class names can be present
+    markers = QUESTION_CLASS_MARKERS if is_question else ANSWER_CLASS_MARKERS
+    if not any((marker.encode() if is_bytes else marker) in html_content for marker in markers):
+        return {'choices': {}} if is_question else {}
+
+    from bs4 import BeautifulSoup
+
+    # Parse only the target elements unless a hidden wrapper could contain one of them
+    hidden_re = HIDDEN_STYLE_BYTES_RE if is_bytes else HIDDEN_STYLE_RE
+    strainer = None if hidden_re.search(html_content) else get_html_strainer(is_question)
+    from_encoding = 'utf-8' if is_bytes else None
+    soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=strainer, from_encoding=from_encoding)
     result = {}
     
     # Remove display:none elements
@@ -616,7 +964,7 @@ def extract_html_content(html_content: str, content_type: str) -> Dict[str, Any]
         elem.decompose()
     
     if content_type == 'question':
-        # Extract question text
+        # Extract question text (the div is reused by the inline-options fallback below)
         question_div = soup.find('div', class_='question')
         if question_div:
             question_text = question_div.get_text(separator='\n', strip=True)
@@ -669,7 +1017,7 @@ def extract_html_content(html_content: str, content_type: str) -> Dict[str, Any]
                         # Try Format 3: No span, letter is direct text (e.g., "A. Choice text")
                         full_text = item.get_text(separator=' ', strip=True)
                         # Match pattern: "A. text" or "A. text"
-                        match = re.match(r'^([A-Z])\.\\s*(.*)', full_text)
+                        match = CHOICE_DOTTED_RE.match(full_text)
                         if match:
                             letter = match.group(1)
                             choice_text = match.group(2).strip()
@@ -689,8 +1037,10 @@ def extract_html_content(html_content: str, content_type: str) -> Dict[str, Any]
         # FORMAT 2: question-options (NEW - handles your HTML format)
         # If no multi-choice-item found, try question-options format
         if not choices:
-            question_options_div = soup.find('div', class_='question-options') or \
-                                   soup.find('div', class_='question-choices-container')
+            # One walk for both container classes, still preferring question-options
+            option_divs = soup.find_all('div', class_=['question-options', 'question-choices-container'])
+            question_options_div = next((div for div in option_divs if 'question-options' in div.get('class', [])), None) or \
+                                   next(iter(option_divs), None)
             if question_options_div:
                 # Find all list items with letter prefix
                 option_items = question_options_div.find_all('li')
@@ -712,7 +1062,7 @@ def extract_html_content(html_content: str, content_type: str) -> Dict[str, Any]
                     if not letter:
                         full_text = item.get_text(separator=' ', strip=True)
                         # Matches "A. Text", "A) Text", or just "A Text" if clear
-                        match = re.match(r'^([A-Z])[\.\)\s]\s*(.*)', full_text)
+                        match = CHOICE_LETTER_RE.match(full_text)
                         if match:
                             letter = match.group(1)
                             choice_text = match.group(2)
@@ -722,15 +1072,12 @@ def extract_html_content(html_content: str, content_type: str) -> Dict[str, Any]
                         choice_text = ' '.join(choice_text.split())
                         choices[letter] = choice_text
                         
-        if not choices and content_type == 'question':
+        if not choices:
             # Fallback: Try to extract options from question text if they're inline
-            question_div = soup.find('div', class_='question')
             if question_div:
                 question_text = question_div.get_text()
                 # Look for pattern: A. text B. text C. text D. text
-                # This regex finds letter-dot-text patterns
-                option_pattern = r'\b([A-D])\.\s+([^\n]+?)(?=\s+[A-D]\.|$)'
-                matches = re.findall(option_pattern, question_text, re.MULTILINE | re.DOTALL)
+                matches = INLINE_OPTION_RE.findall(question_text)
                 
                 if matches:
                     for letter, text in matches:
@@ -850,6 +1197,88 @@ def extract_zip_file(zip_file, temp_dir: Path) -> Dict[str, Dict[str, bytes]]:
 
     return folders
 
+def spool_uploaded_zip(uploaded_zip) -> str:
+    """
+    Copy an uploaded ZIP to a temporary file once per upload and return its path
+
+    Streamlit reruns the whole script on every interaction, so the spooled copy
+    is remembered in session state and reused until a different file is uploaded.
+    """
+    spooled = st.session_state.get("spooled_zip")
+    if spooled and spooled["file_id"] == uploaded_zip.file_id and os.path.exists(spooled["path"]):
+        return spooled["path"]
+
+    discard_spooled_zip()
+    sweep_spooled_zips()
+    uploaded_zip.seek(0)
+    UPLOAD_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".zip", dir=UPLOAD_SPOOL_DIR) as tmp:
+        shutil.copyfileobj(uploaded_zip, tmp, length=1 << 20)
+
+    st.session_state.spooled_zip = {"file_id": uploaded_zip.file_id, "path": tmp.name}
+    return tmp.name
+
+def sweep_spooled_zips():
+    """Remove spooled ZIPs left behind by sessions that ended without discarding them"""
+    cutoff = time.time() - UPLOAD_SPOOL_MAX_AGE_SECONDS
+    try:
+        with os.scandir(UPLOAD_SPOOL_DIR) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+    except FileNotFoundError:
+        pass
+
+def discard_spooled_zip():
+    """Remove the temporary copy of a previously uploaded ZIP, if any"""
+    spooled = st.session_state.pop("spooled_zip", None)
+    if spooled:
+        try:
+            os.unlink(spooled["path"])
+        except OSError:
+            pass
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def preview_zip_contents(zip_path: str, zip_size: int) -> Dict[str, List[str]]:
+    """
+    List the files in each folder of a ZIP for the upload preview
+
+    Cached per (path, size) so reruns triggered by other widgets on the create
+    page don't re-read the ZIP central directory.
+
+    Returns:
+        Dict mapping folder names to the file names they contain
+    """
+    folders_preview = {}
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for file_info in zip_ref.infolist():
+            # Skip directories, empty marker entries and macOS resource forks
+            if file_info.is_dir() or file_info.file_size == 0:
+                continue
+            file_path = file_info.filename
+            if '__MACOSX' in file_path:
+                continue
+
+            folder, sep, rest = file_path.partition('/')
+            if not sep:
+                continue
+            folders_preview.setdefault(folder, []).append(rest.rsplit('/', 1)[-1])
+
+    return folders_preview
+
+def render_folders_preview(folders_preview: Dict[str, List[str]]):
+    """Render a folder -> files preview as a single markdown block"""
+    blocks = []
+    for folder, files in folders_preview.items():
+        lines = [f"**{folder}/**"]
+        lines.extend(f"  - {file}" for file in files)
+        blocks.append("\n".join(lines))
+    st.markdown("\n\n".join(blocks))
+
 def process_uploaded_folders(uploaded_files: List, exam_name: str) -> List[Dict[str, Any]]:
     """Process uploaded folders and extract question data"""
     questions = []
@@ -886,13 +1315,13 @@ def process_uploaded_folders(uploaded_files: List, exam_name: str) -> List[Dict[
 
             # Process summary_question.html
             if 'summary_question.html' in files:
-                content = files['summary_question.html'].read().decode('utf-8')
+                content = files['summary_question.html'].read()
                 question_content = extract_html_content(content, 'question')
                 question_data.update(question_content)
 
             # Process summary_discussion_ai.html
             if 'summary_discussion_ai.html' in files:
-                content = files['summary_discussion_ai.html'].read().decode('utf-8')
+                content = files['summary_discussion_ai.html'].read()
                 answer_content = extract_html_content(content, 'answer')
                 question_data.update(answer_content)
 
@@ -930,10 +1359,7 @@ def process_zip_file(zip_file, exam_name: str) -> List[Dict[str, Any]]:
         metadata_map = {}
         if 'upload_metadata.json' in folders:
             try:
-                metadata_content = folders['upload_metadata.json']
-                if isinstance(metadata_content, bytes):
-                    metadata_content = metadata_content.decode('utf-8')
-                metadata = json.loads(metadata_content)
+                metadata = parse_json_bytes(folders['upload_metadata.json'])
 
                 # Create a map of folder_name -> metadata
                 for q_meta in metadata.get('questions', []):
@@ -965,11 +1391,7 @@ def process_zip_file(zip_file, exam_name: str) -> List[Dict[str, Any]]:
             print(files)
             if 'metadata.json' in files:
                 try:
-                    metadata_content = files['metadata.json']
-                    if isinstance(metadata_content, bytes):
-                        metadata_content = metadata_content.decode('utf-8')
-                    
-                    metadata = json.loads(metadata_content)
+                    metadata = parse_json_bytes(files['metadata.json'])
                     last_update_date = metadata.get('last_update_date', 'Unknown')
                     
                     print(last_update_date)
@@ -984,13 +1406,13 @@ def process_zip_file(zip_file, exam_name: str) -> List[Dict[str, Any]]:
 
             # Process summary_question.html
             if 'summary_question.html' in files:
-                content = files['summary_question.html'].decode('utf-8')
+                content = files['summary_question.html']
                 question_content = extract_html_content(content, 'question')
                 question_data.update(question_content)
 
             # Process summary_discussion_ai.html
             if 'summary_discussion_ai.html' in files:
-                content = files['summary_discussion_ai.html'].decode('utf-8')
+                content = files['summary_discussion_ai.html']
                 answer_content = extract_html_content(content, 'answer')
                 question_data.update(answer_content)
 
@@ -1055,8 +1477,12 @@ def save_exam(exam_name: str, questions: List[Dict[str, Any]], password: str = N
         exam_data['password_protected'] = False
 
     exam_file = exam_dir / "exam_data.json"
-    with open(exam_file, 'w', encoding='utf-8') as f:
-        json.dump(exam_data, f, indent=2, ensure_ascii=False)
+    # Compact: exam files are only read by the app, and whitespace would just add parse time
+    exam_file.write_bytes(dump_json_bytes(exam_data, compact=True))
+
+    update_exam_index(exam_name, summarize_exam(exam_data))
+    list_exams.clear()
+    existing_exam_names.clear()
 
 def load_question_metadata(exam_name: str, topic_index: int, question_index: int) -> dict:
     """Load metadata.json from a specific question folder
@@ -1074,36 +1500,184 @@ def load_question_metadata(exam_name: str, topic_index: int, question_index: int
     
     if metadata_path.exists():
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return parse_json_bytes(metadata_path.read_bytes())
         except Exception as e:
             print(f"Error loading metadata for {folder_name}: {e}")
             return {}
     return {}
 
+@st.cache_resource(max_entries=16, show_spinner=False)
+def load_exam_cached(exam_name: str, mtime_ns: int) -> Dict[str, Any]:
+    """
+    Parse exam data from JSON file, cached until the file's modification time changes
+
+    The parsed dict is shared across reruns and sessions rather than copied on
+    every call, so callers must treat it as read-only.
+    """
+    exam_file = DATA_DIR / exam_name / "exam_data.json"
+    exam_data = parse_json_bytes(exam_file.read_bytes())
+    exam_data['mtime_ns'] = mtime_ns
+
+    # Precompute per-question ids used as session state keys on the study page
+    exam_data['question_ids'] = [f"q_{q['topic_index']}_{q['question_index']}" for q in exam_data['questions']]
+
+    # Per-question render data for the study page, kept as parallel lists: deduplicated
+    # question HTML, choices in display order and the saved images that exist on disk,
+    # so reruns don't redo any of them
+    image_files = list_exam_image_files(exam_name)
+    exam_data['question_html'] = [
+        remove_duplicate_chunks(q.get('question', 'No question text available')).replace('\n', '<br>')
+        for q in exam_data['questions']
+    ]
+    exam_data['sorted_choices'] = [sorted(q.get('choices', {}).items()) for q in exam_data['questions']]
+    exam_data['valid_images'] = [
+        [img_file for img_file in q.get('saved_images', []) if img_file in image_files]
+        for q in exam_data['questions']
+    ]
+
+    return exam_data
+
 def load_exam(exam_name: str) -> Dict[str, Any]:
-    """Load exam data from JSON file and populate last_updated from metadata.json"""
+    """Load exam data (read-only) from JSON file, or None if the exam doesn't exist"""
     exam_file = DATA_DIR / exam_name / "exam_data.json"
-    if exam_file.exists():
-        with open(exam_file, 'r', encoding='utf-8') as f:
-            exam_data = json.load(f)
-        
-        return exam_data
-    return None
+    try:
+        mtime_ns = exam_file.stat().st_mtime_ns
+    except OSError:
+        return None
+    return load_exam_cached(exam_name, mtime_ns)
 
 
 
+@st.cache_data(ttl=5, show_spinner=False)
 def list_exams() -> List[str]:
-    """List all available exams"""
-    if not DATA_DIR.exists():
+    """List all available exams, cached briefly and cleared whenever an exam is saved or deleted"""
+    try:
+        # DirEntry.is_dir uses the type scandir already read, so only the data file check stats
+        with os.scandir(DATA_DIR) as entries:
+            return sorted(
+                entry.name for entry in entries
+                if entry.is_dir(follow_symlinks=False) and os.path.exists(os.path.join(entry.path, "exam_data.json"))
+            )
+    except FileNotFoundError:
         return []
-    return [d.name for d in DATA_DIR.iterdir() if d.is_dir() and (d / "exam_data.json").exists()]
+
+def summarize_exam(exam_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields the home page needs from full exam data"""
+    return {
+        'question_count': exam_data.get('question_count', len(exam_data.get('questions', []))),
+        'created_at': exam_data.get('created_at', 'N/A'),
+        'password_protected': exam_data.get('password_protected', False)
+    }
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def read_exam_index(mtime_ns: int, size: int) -> Dict[str, Dict[str, Any]]:
+    """Read the exam index file, cached on its modification time and size"""
+    return parse_json_bytes(EXAM_INDEX_FILE.read_bytes())
+
+def read_exam_index_uncached() -> Dict[str, Dict[str, Any]]:
+    """Read the exam index file as it is on disk now, or {} if it is missing or unreadable"""
+    try:
+        return parse_json_bytes(EXAM_INDEX_FILE.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+@st.cache_resource(show_spinner=False)
+def get_exam_index_lock() -> threading.Lock:
+    """
+    Lock serializing read-modify-write updates of the exam index across sessions
+
+    Held by st.cache_resource rather than a module global because Streamlit
+    re-executes this script, and its globals, on every rerun.
+    """
+    return threading.Lock()
+
+def write_exam_index(index: Dict[str, Dict[str, Any]]):
+    """Atomically replace the exam index file (callers hold get_exam_index_lock())"""
+    # A unique temp file per write, so concurrent writers never replace each other's
+    fd, temp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=".index-", suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dump_json_bytes(index))
+        os.replace(temp_path, EXAM_INDEX_FILE)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+def load_exam_index(exam_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load summaries (question count, creation date, protection) for the given exams
+
+    Exams missing from the index (e.g. created before it existed) are
+    summarized from their exam data once and written back; entries for exams
+    no longer on disk are dropped.
+    """
+    try:
+        stat = EXAM_INDEX_FILE.stat()
+        index = read_exam_index(stat.st_mtime_ns, stat.st_size)
+    except (OSError, ValueError):
+        index = {}
+
+    missing = [name for name in exam_names if name not in index]
+    if missing or len(index) != len(exam_names):
+        with get_exam_index_lock():
+            # Rebuild from the file as it is now, so a concurrent update isn't lost
+            index = read_exam_index_uncached()
+            index = {name: index[name] for name in exam_names if name in index}
+            for name in exam_names:
+                if name not in index:
+                    exam_data = load_exam(name)
+                    if exam_data:
+                        index[name] = summarize_exam(exam_data)
+            write_exam_index(index)
+
+    return index
+
+def update_exam_index(exam_name: str, summary: Dict[str, Any] = None):
+    """Add or replace an exam's summary in the index, or remove it when summary is None"""
+    with get_exam_index_lock():
+        index = read_exam_index_uncached()
+        if summary is None:
+            index.pop(exam_name, None)
+        else:
+            index[exam_name] = summary
+        write_exam_index(index)
+
+@st.cache_resource(ttl=5, show_spinner=False)
+def existing_exam_names() -> frozenset:
+    """
+    Set of exam names for fast existence checks while typing a new exam name
+
+    Cached as a shared object (st.cache_data would copy it on every read) with the
+    same ttl as list_exams, and cleared together with it.
+    """
+    return frozenset(list_exams())
+
+def remove_tree(path: str):
+    """
+    Delete a directory tree with a single scandir pass per directory
+
+    Exam folders only hold regular files and plain subdirectories, so the
+    symlink and error-handling machinery of shutil.rmtree isn't needed.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                remove_tree(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
 
 def delete_exam(exam_name: str):
     """Delete an exam and its data"""
     exam_dir = DATA_DIR / exam_name
     if exam_dir.exists():
-        shutil.rmtree(exam_dir)
+        remove_tree(str(exam_dir))
+        update_exam_index(exam_name, None)
+        list_exams.clear()
+        existing_exam_names.clear()
         return True
     return False
 
@@ -1118,7 +1692,7 @@ def unlock_exam_dialog(exam_name: str):
     st.markdown("---")
     st.markdown(f"### 🔐 Unlock Exam: {exam_name}")
 
-    with st.form(key=f"unlock_form_{exam_name}"):
+    with st.form(key=f"unlock_form_{exam_key_id(exam_name)}"):
         password = st.text_input(
             "Enter Password",
             type="password",
@@ -1136,20 +1710,24 @@ def unlock_exam_dialog(exam_name: str):
             st.rerun()
 
         if submit:
-            if password:
-                stored_hash = exam_data.get('password_hash')
-                if verify_password(password, stored_hash):
-                    # Add to authenticated exams
-                    if exam_name not in st.session_state.authenticated_exams:
-                        st.session_state.authenticated_exams.append(exam_name)
-                    
-                    st.success("✅ Exam unlocked successfully!")
-                    del st.session_state.exam_to_unlock
-                    
-                    # Stay on home page to show unlocked view (don't redirect to study)
-                    st.rerun()
-                else:
-                    st.error("❌ Incorrect password. Please try again.")
+            # Pad every outcome to the same minimum duration so response time
+            # doesn't reveal which check failed
+            started = time.perf_counter()
+            stored_hash = exam_data.get('password_hash')
+            unlocked = bool(password) and get_password_executor().submit(verify_password, password, stored_hash).result()
+            time.sleep(max(0.0, UNLOCK_MIN_SECONDS - (time.perf_counter() - started)))
+
+            if unlocked:
+                # Add to authenticated exams
+                st.session_state.authenticated_exams.add(exam_name)
+                
+                st.success("✅ Exam unlocked successfully!")
+                del st.session_state.exam_to_unlock
+                
+                # Stay on home page to show unlocked view (don't redirect to study)
+                rerun_fragment()
+            elif password:
+                st.error("❌ Incorrect password. Please try again.")
             else:
                 st.warning("⚠️ Please enter a password")
 
@@ -1158,8 +1736,10 @@ def unlock_exam_dialog(exam_name: str):
 
 def home_page():
     """Display home page with exam list"""
-    st.markdown('<h1 class="main-header">📚 NotJustExam Study Portal</h1>', unsafe_allow_html=True)
-    st.markdown("### Your comprehensive exam preparation platform")
+    st.markdown(
+        '<h1 class="main-header">📚 NotJustExam Study Portal</h1>\n\n### Your comprehensive exam preparation platform',
+        unsafe_allow_html=True
+    )
 
     # Create new exam button
     col1, col2, col3 = st.columns([1, 1, 2])
@@ -1170,6 +1750,29 @@ def home_page():
 
     st.markdown("---")
 
+    exam_list_fragment()
+
+
+def exam_key_id(exam_name: str) -> str:
+    """Short stable id for an exam, used to build widget keys independent of the name's length or characters"""
+    return hashlib.blake2b(exam_name.encode(), digest_size=6).hexdigest()
+
+def rerun_fragment():
+    """Rerun only the current fragment, or the whole app when not in a fragment rerun"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+@st.fragment
+def exam_list_fragment():
+    """
+    Exam table, per-exam actions and the unlock form
+
+    Runs as a fragment so selecting rows, unlocking and deleting only rerun
+    this section; opening an exam for study still reruns the whole app.
+    """
     # List existing exams
     exams = list_exams()
 
@@ -1178,56 +1781,75 @@ def home_page():
     else:
         st.subheader(f"📖 Your Exams ({len(exams)})")
 
-        for exam_name in exams:
-            exam_data = load_exam(exam_name)
-            if exam_data:
-                is_protected = exam_data.get('password_protected', False)
-                is_authenticated = is_exam_authenticated(exam_name)
-
-                with st.container():
-                    col1, col2, col3 = st.columns([3, 1, 1])
-
-                    with col1:
-                        # Show lock icon if protected
-                        icon = "🔒" if is_protected and not is_authenticated else "📚"
-                        st.markdown(f"### {icon} {exam_name}")
-                        st.caption(f"{exam_data['question_count']} questions | Created: {exam_data.get('created_at', 'N/A')[:10]}")
-                        if is_protected and is_authenticated:
-                            st.caption("✅ Unlocked")
-
-                    with col2:
-                        # Show Unlock or Study button
-                        if is_protected and not is_authenticated:
-                            if st.button("🔓 Unlock", key=f"unlock_{exam_name}", use_container_width=True):
-                                st.session_state.exam_to_unlock = exam_name
-                                st.rerun()
-                        else:
-                            if st.button("📖 Study", key=f"study_{exam_name}", use_container_width=True):
-                                st.session_state.selected_exam = exam_name
-                                st.session_state.current_page = "study_exam"
-                                st.session_state.current_question_index = 0
-                                st.session_state.show_answer = {}
-                                st.rerun()
-
-                    with col3:
-                        if st.button("🗑️ Delete", key=f"delete_{exam_name}", use_container_width=True):
-                            if delete_exam(exam_name):
-                                # Remove from authenticated list if present
-                                if exam_name in st.session_state.get('authenticated_exams', []):
-                                    st.session_state.authenticated_exams.remove(exam_name)
-                                st.success(f"Deleted exam: {exam_name}")
-                                st.rerun()
-                            else:
-                                st.error("Failed to delete exam")
-
-                    # ADD DOWNLOAD BUTTON - Only show if exam is unlocked or not protected
-                    if not is_protected or is_authenticated:
-                        with st.container():
-                            if st.button("📥 Download Offline", key=f"download_{exam_name}", use_container_width=True):
-                                download_exam_handler(exam_name)
-
-                    st.markdown("---")
+        exam_index = load_exam_index(exams)
+        listed_exams = [name for name in exams if name in exam_index]
+
+        # One dataframe for the whole list instead of a row of widgets per exam
+        exam_table = {"Exam": [], "Questions": [], "Created": [], "Status": []}
+        for exam_name in listed_exams:
+            summary = exam_index[exam_name]
+            is_protected = summary['password_protected']
+            is_authenticated = is_exam_authenticated(exam_name)
+
+            # Show lock icon if protected
+            icon = "🔒" if is_protected and not is_authenticated else "📚"
+            exam_table["Exam"].append(f"{icon} {exam_name}")
+            exam_table["Questions"].append(summary['question_count'])
+            exam_table["Created"].append(summary['created_at'][:10])
+            if is_protected:
+                exam_table["Status"].append("✅ Unlocked" if is_authenticated else "Locked")
+            else:
+                exam_table["Status"].append("")
+
+        event = st.dataframe(
+            exam_table,
+            key=f"exam_table_{st.session_state.exam_table_version}",
+            on_select="rerun",
+            selection_mode="single-row",
+            hide_index=True,
+            use_container_width=True
+        )
+
+        selected_rows = [row for row in event.selection.rows if row < len(listed_exams)]
+        if not selected_rows:
+            st.caption("👆 Select an exam to study, download or delete it")
+        else:
+            exam_name = listed_exams[selected_rows[0]]
+            is_protected = exam_index[exam_name]['password_protected']
+            is_authenticated = is_exam_authenticated(exam_name)
+
+            col1, col2, col3 = st.columns(3)
 
+            with col1:
+                # Show Unlock or Study button
+                if is_protected and not is_authenticated:
+                    if st.button("🔓 Unlock", key=f"unlock_{exam_key_id(exam_name)}", use_container_width=True):
+                        st.session_state.exam_to_unlock = exam_name
+                        rerun_fragment()
+                else:
+                    if st.button("📖 Study", key=f"study_{exam_key_id(exam_name)}", use_container_width=True):
+                        st.session_state.selected_exam = exam_name
+                        st.session_state.current_page = "study_exam"
+                        st.session_state.current_question_index = 0
+                        st.session_state.show_answer = set()
+                        st.rerun()
+
+            with col2:
+                # Only allow download if exam is unlocked or not protected
+                if not is_protected or is_authenticated:
+                    download_exam_handler(exam_name)
+
+            with col3:
+                if st.button("🗑️ Delete", key=f"delete_{exam_key_id(exam_name)}", use_container_width=True):
+                    if delete_exam(exam_name):
+                        # Remove from authenticated exams if present
+                        st.session_state.authenticated_exams.discard(exam_name)
+                        # Fresh table key so the selection doesn't move to the next exam
+                        st.session_state.exam_table_version += 1
+                        st.success(f"Deleted exam: {exam_name}")
+                        rerun_fragment()
+                    else:
+                        st.error("Failed to delete exam")
 
         # Password unlock dialog
         if "exam_to_unlock" in st.session_state and st.session_state.exam_to_unlock:
@@ -1266,7 +1888,7 @@ def create_exam_page():
     )
 
     # Check if exam already exists
-    if exam_name and exam_name in list_exams():
+    if exam_name and exam_name in existing_exam_names():
         st.warning(f"⚠️ Exam '{exam_name}' already exists. Creating it will replace the existing exam.")
 
     st.markdown("### Choose Upload Method")
@@ -1279,6 +1901,7 @@ def create_exam_page():
     )
 
     uploaded_zip = None
+    uploaded_zip_path = None
     uploaded_files = None
 
     if upload_method == "📦 Upload ZIP File (Recommended)":
@@ -1349,31 +1972,18 @@ def create_exam_page():
         if uploaded_zip:
             st.success(f"✅ ZIP file uploaded: {uploaded_zip.name} ({uploaded_zip.size / 1024:.1f} KB)")
 
+            # Spool to disk once so preview and processing both read from the same file
+            uploaded_zip_path = spool_uploaded_zip(uploaded_zip)
+
             # Preview ZIP contents
             with st.expander("📂 View ZIP contents"):
                 try:
-                    with zipfile.ZipFile(uploaded_zip, 'r') as zip_ref:
-                        file_list = zip_ref.namelist()
-                        folders_preview = {}
-
-                        for file_path in file_list:
-                            if not file_path.endswith('/') and not '__MACOSX' in file_path:
-                                parts = Path(file_path).parts
-                                if len(parts) >= 2:
-                                    folder = parts[0]
-                                    if folder not in folders_preview:
-                                        folders_preview[folder] = []
-                                    folders_preview[folder].append(parts[-1])
-
-                        for folder, files in folders_preview.items():
-                            st.write(f"**{folder}/**")
-                            for file in files:
-                                st.write(f"  - {file}")
-
-                    # Reset file pointer
-                    uploaded_zip.seek(0)
+                    folders_preview = preview_zip_contents(uploaded_zip_path, uploaded_zip.size)
+                    render_folders_preview(folders_preview)
                 except Exception as e:
                     st.error(f"Error reading ZIP file: {str(e)}")
+        else:
+            discard_spooled_zip()
 
     else:  # Individual files upload
         st.markdown("""
@@ -1403,10 +2013,7 @@ def create_exam_page():
                             folders_preview[folder] = []
                         folders_preview[folder].append(parts[-1])
 
-                for folder, files in folders_preview.items():
-                    st.write(f"**{folder}/**")
-                    for file in files:
-                        st.write(f"  - {file}")
+                render_folders_preview(folders_preview)
 
     # Parse and save button
     st.markdown("---")
@@ -1431,8 +2038,8 @@ def create_exam_page():
                     questions = []
 
                     # Process based on upload method
-                    if uploaded_zip:
-                        questions = process_zip_file(uploaded_zip, exam_name)
+                    if uploaded_zip_path:
+                        questions = process_zip_file(uploaded_zip_path, exam_name)
                     elif uploaded_files:
                         questions = process_uploaded_folders(uploaded_files, exam_name)
 
@@ -1446,15 +2053,19 @@ def create_exam_page():
                             st.info("🔒 This exam is password protected")
                         st.balloons()
 
-                        # Show summary
+                        # Show summary (single pass over questions)
+                        topics = set()
+                        images = 0
+                        for q in questions:
+                            topics.add(q['topic_index'])
+                            images += len(q.get('saved_images') or ())
+
                         col1, col2, col3 = st.columns(3)
                         with col1:
                             st.metric("Total Questions", len(questions))
                         with col2:
-                            topics = len(set(q['topic_index'] for q in questions))
-                            st.metric("Topics", topics)
+                            st.metric("Topics", len(topics))
                         with col3:
-                            images = sum(len(q.get('saved_images', [])) for q in questions)
                             st.metric("Images", images)
 
                         st.info("👉 Go back to home to start studying!")
@@ -1463,6 +2074,82 @@ def create_exam_page():
 
                 except Exception as e:
                     st.error(f"❌ Error processing files: {str(e)}")
+                finally:
+                    # The spooled copy is only needed until processing finishes
+                    if uploaded_zip_path:
+                        discard_spooled_zip()
+
+
+@st.cache_data(max_entries=ANSWER_HTML_CACHE_ENTRIES, ttl=RENDER_CACHE_TTL_SECONDS, show_spinner=False)
+def render_answer_html(exam_name: str, mtime_ns: int, question_index: int) -> str:
+    """
+    Build the revealed answer of a question (suggested answer, discussion and
+    AI recommendation) as one markdown string with embedded images
+
+    Cached per exam version and question, so toggling the answer or navigating
+    back to a question doesn't rebuild the HTML or re-encode its images.
+    """
+    question = load_exam_cached(exam_name, mtime_ns)['questions'][question_index]
+    folder_prefix = f"topic_{question['topic_index']}_question_{question['question_index']}"
+    sections = []
+
+    # Suggested Answer with HTML support
+    if question.get('suggested_answer_html'):
+        answer_html_converted = convert_html_images_to_base64(
+            question['suggested_answer_html'], 
+            exam_name, 
+            folder_prefix
+        )
+        sections.append("### ✅ Suggested Answer")
+        sections.append(f"""<div class="answer" style="
+    margin-top: 24px;
+    padding: 20px;
+    background: #f8f9fa;
+    border-radius: 10px;
+    border-left: 4px solid #28a745;
+">
+    {answer_html_converted}
+</div>""")
+
+    # Discussion Summary with HTML support
+    if question.get('discussion_summary_html'):
+        discussion_html_converted = convert_html_images_to_base64(
+            question['discussion_summary_html'], 
+            exam_name, 
+            folder_prefix
+        )
+        sections.append("### 💬 Discussion")
+        sections.append(f"""<div class="discussion" style="
+    margin: 16px 0;
+    padding: 20px;
+    background: white;
+    border-radius: 10px;
+    border-left: 4px solid #667eea;
+    line-height: 1.7;
+">
+    {discussion_html_converted}
+</div>""")
+
+    # AI Recommendation with HTML support
+    if question.get('ai_recommendation_html'):
+        ai_html_converted = convert_html_images_to_base64(
+            question['ai_recommendation_html'], 
+            exam_name, 
+            folder_prefix
+        )
+        sections.append("### 🤖 AI Recommendation")
+        sections.append(f"""<div class="ai-answer" style="
+    margin: 16px 0;
+    padding: 20px;
+    background: white;
+    border-radius: 10px;
+    border-left: 4px solid #764ba2;
+    line-height: 1.7;
+">
+    {ai_html_converted}
+</div>""")
+
+    return "\n\n".join(sections)
 
 
 def study_exam_page():
@@ -1507,11 +2194,8 @@ def study_exam_page():
 
     # ENHANCED: Navigation, Question Selector, and Answer Toggle Buttons at TOP
     question = questions[current_idx]
-    question_id = f"q_{question['topic_index']}_{question['question_index']}"
-
-    # Initialize show_answer state for this question
-    if question_id not in st.session_state.show_answer:
-        st.session_state.show_answer[question_id] = False
+    question_id = exam_data['question_ids'][current_idx]
+    answer_shown = question_id in st.session_state.show_answer
 
     # Top button row with 5 columns (added question selector)
     col1, col2, col3, col4, col5 = st.columns([1, 1, 1.2, 1, 0.8])
@@ -1549,13 +2233,13 @@ def study_exam_page():
             st.rerun()
 
     with col4:
-        if not st.session_state.show_answer[question_id]:
+        if not answer_shown:
             if st.button("💡 Show Answer", key=f"show_top_{question_id}", use_container_width=True):
-                st.session_state.show_answer[question_id] = True
+                st.session_state.show_answer.add(question_id)
                 st.rerun()
         else:
             if st.button("🔒 Hide Answer", key=f"hide_top_{question_id}", use_container_width=True):
-                st.session_state.show_answer[question_id] = False
+                st.session_state.show_answer.discard(question_id)
                 st.rerun()
 
     with col5:
@@ -1569,12 +2253,8 @@ def study_exam_page():
 
     # Question content
     with st.container():
-        # Get and deduplicate question text
-        question_text = question.get('question', 'No question text available')
-        question_text = remove_duplicate_chunks(question_text)
-
-        # Convert to HTML with line breaks
-        question_html = question_text.replace('\n', '<br>')
+        # Deduplicated question text with line breaks, precomputed when the exam was loaded
+        question_html = exam_data['question_html'][current_idx]
 
         # Display question with clean styled HTML (white background, colored border)
         styled_question = f"""
@@ -1593,135 +2273,63 @@ def study_exam_page():
         st.markdown(styled_question, unsafe_allow_html=True)
 
         # Display question images only
-        if question.get('saved_images'):
-            for img_file in question['saved_images']:
-                img_path = DATA_DIR / st.session_state.selected_exam / "images" / img_file
-                if img_path.exists():
-                    st.image(str(img_path))
-
-        # Display answer choices if they exist with HTML styling
-        if question.get('choices'):
-            st.markdown("### Answer Options:")
-
-            # Create styled options HTML
-            for letter, text in sorted(question['choices'].items()):
+        if exam_data['valid_images'][current_idx]:
+            images_dir = DATA_DIR / exam_name / "images"
+            for img_file in exam_data['valid_images'][current_idx]:
+                # Images are written together with the exam, so its mtime versions them too
+                st.image(load_image_bytes(str(images_dir / img_file), exam_data['mtime_ns']))
+
+        # Display answer choices if they exist with HTML styling, as one markdown block
+        if exam_data['sorted_choices'][current_idx]:
+            options_md = ["### Answer Options:", ""]
+
+            for letter, text in exam_data['sorted_choices'][current_idx]:
                 is_correct = (letter == question.get('suggested_answer') or 
                              letter == question.get('correct_answer'))
 
                 # Show correct answer with green styling when answer is shown
-                if st.session_state.show_answer.get(question_id, False) and is_correct:
-                    option_html = f"""
-                    <div style="
-                        padding: 16px;
-                        margin: 12px 0;
-                        border: 2px solid #28a745;
-                        background: #d4edda;
-                        border-radius: 10px;
-                        font-weight: 500;
-                    ">
-                        <strong>{letter}.</strong> {text}
-                    </div>
-                    """
+                if answer_shown and is_correct:
+                    options_md.append(f"""<div style="
+    padding: 16px;
+    margin: 12px 0;
+    border: 2px solid #28a745;
+    background: #d4edda;
+    border-radius: 10px;
+    font-weight: 500;
+">
+    <strong>{letter}.</strong> {text}
+</div>""")
                 else:
-                    option_html = f"""
-                    <div style="
-                        padding: 16px;
-                        margin: 12px 0;
-                        border: 2px solid #e9ecef;
-                        background: white;
-                        border-radius: 10px;
-                    ">
-                        <strong>{letter}.</strong> {text}
-                    </div>
-                    """
-                st.markdown(option_html, unsafe_allow_html=True)
+                    options_md.append(f"""<div style="
+    padding: 16px;
+    margin: 12px 0;
+    border: 2px solid #e9ecef;
+    background: white;
+    border-radius: 10px;
+">
+    <strong>{letter}.</strong> {text}
+</div>""")
+
+            st.markdown("\n".join(options_md), unsafe_allow_html=True)
 
     # Display answer if shown
-    if st.session_state.show_answer.get(question_id, False):
+    if answer_shown:
         with st.container():
             # # Show answer images only here
             # if question.get('answer_images'):
+            #     images_dir = DATA_DIR / exam_name / "images"
             #     for img_file in question['answer_images']:
-            #         img_path = DATA_DIR / st.session_state.selected_exam / "images" / img_file
+            #         img_path = images_dir / img_file
             #         if img_path.exists():
             #             st.image(str(img_path))
 
-            # Suggested Answer with HTML support
-            if question.get('suggested_answer_html'):
-                st.markdown("### ✅ Suggested Answer")
-
-                # Convert HTML images to base64
-                folder_prefix = f"topic_{question['topic_index']}_question_{question['question_index']}"
-                answer_html_converted = convert_html_images_to_base64(
-                    question['suggested_answer_html'], 
-                    exam_name, 
-                    folder_prefix
-                )
-
-                answer_styled = f"""
-                <div class="answer" style="
-                    margin-top: 24px;
-                    padding: 20px;
-                    background: #f8f9fa;
-                    border-radius: 10px;
-                    border-left: 4px solid #28a745;
-                ">
-                    {answer_html_converted}
-                </div>
-                """
-                st.markdown(answer_styled, unsafe_allow_html=True)
-            elif question.get('suggested_answer'):
+            if not question.get('suggested_answer_html') and question.get('suggested_answer'):
                 st.success(f"**Answer:** {question['suggested_answer']}")
 
-            # Discussion Summary with HTML support
-            if question.get('discussion_summary_html'):
-                st.markdown("### 💬 Discussion")
-
-                # Convert HTML images to base64
-                discussion_html_converted = convert_html_images_to_base64(
-                    question['discussion_summary_html'], 
-                    exam_name, 
-                    folder_prefix
-                )
-
-                discussion_styled = f"""
-                <div class="discussion" style="
-                    margin: 16px 0;
-                    padding: 20px;
-                    background: white;
-                    border-radius: 10px;
-                    border-left: 4px solid #667eea;
-                    line-height: 1.7;
-                ">
-                    {discussion_html_converted}
-                </div>
-                """
-                st.markdown(discussion_styled, unsafe_allow_html=True)
-
-            # AI Recommendation with HTML support
-            if question.get('ai_recommendation_html'):
-                st.markdown("### 🤖 AI Recommendation")
-
-                # Convert HTML images to base64
-                ai_html_converted = convert_html_images_to_base64(
-                    question['ai_recommendation_html'], 
-                    exam_name, 
-                    folder_prefix
-                )
-
-                ai_styled = f"""
-                <div class="ai-answer" style="
-                    margin: 16px 0;
-                    padding: 20px;
-                    background: white;
-                    border-radius: 10px;
-                    border-left: 4px solid #764ba2;
-                    line-height: 1.7;
-                ">
-                    {ai_html_converted}
-                </div>
-                """
-                st.markdown(ai_styled, unsafe_allow_html=True)
+            # Suggested answer, discussion and AI recommendation in a single element
+            answer_md = render_answer_html(exam_name, exam_data['mtime_ns'], current_idx)
+            if answer_md:
+                st.markdown(answer_md, unsafe_allow_html=True)
 
 
 def main():
@@ -1730,9 +2338,8 @@ def main():
 
     # Sidebar
     with st.sidebar:
-        st.markdown("# 🎓 NotJustExam")
-        st.markdown("### Premium Exam Dumps & Study Materials")
-        st.markdown("---")
+        # Static sidebar text is sent as one markdown element per block rather than one per line
+        st.markdown("# 🎓 NotJustExam\n### Premium Exam Dumps & Study Materials\n---")
 
         # Navigation
         if st.session_state.current_page != "home":
@@ -1750,9 +2357,9 @@ def main():
             if exam_data:
                 st.caption(f"{exam_data['question_count']} questions")
 
-        st.markdown("---")
-        st.markdown("### About")
         st.markdown("""
+        ---
+        ### About
         NotJustExam provides comprehensive exam preparation materials featuring:
         - ✅ Verified exam questions
         - 💬 Community discussions
@@ -1760,15 +2367,18 @@ def main():
         - 📚 Detailed references
         """)
 
-    # Route to appropriate page
-    if st.session_state.current_page == "home":
-        home_page()
-    elif st.session_state.current_page == "create_exam":
-        create_exam_page()
-    elif st.session_state.current_page == "study_exam":
-        study_exam_page()
-    else:
-        home_page()
+    # Route to appropriate page, rendered into a single slot so a page change
+    # replaces the previous page's elements in one step
+    page_slot = st.empty()
+    with page_slot.container():
+        if st.session_state.current_page == "home":
+            home_page()
+        elif st.session_state.current_page == "create_exam":
+            create_exam_page()
+        elif st.session_state.current_page == "study_exam":
+            study_exam_page()
+        else:
+            home_page()
 
 if __name__ == "__main__":
     main()
@@ -7,11 +7,108 @@ Now with automatic ZIP file creation and metadata.json support!
 """
 
 import os
+import re
 import shutil
 from pathlib import Path
 import zipfile
 import json
+from collections import deque
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+# HTML files every question folder must contain
+REQUIRED_FILES = ('summary_question.html', 'summary_discussion_ai.html')
+
+# Image formats the app can display
+IMAGE_SUFFIXES = frozenset({'.png', '.jpg', '.jpeg'})
+
+# Worker threads for per-folder processing, which is I/O-bound
+MAX_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+# Already-compressed files are stored as-is in ZIPs; everything else is deflated at the fastest level
+STORED_SUFFIXES = ('.png', '.jpg', '.jpeg', '.zip')
+ZIP_COMPRESSLEVEL = 1
+
+def write_zip_entry(zipf: zipfile.ZipFile, file_path, arcname):
+    """Add a file to a ZIP, storing already-compressed formats instead of deflating them again"""
+    if os.path.splitext(file_path)[1].lower() in STORED_SUFFIXES:
+        zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED)
+    else:
+        zipf.write(file_path, arcname, compress_type=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL)
+
+# Question folder names: topic_<topic_index>_question_<question_index>
+FOLDER_NAME_RE = re.compile(r'topic_\d+_question_\d+')
+
+def parse_json_bytes(data: bytes):
+    """Parse UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dump_json_bytes(data) -> bytes:
+    """Serialize data to indented UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def walk_files(root) -> list:
+    """
+    List every file under a directory, breadth-first, as path strings
+
+    Uses os.scandir so entry types come from the directory listing. Like
+    Path.rglob, symlinked directories are not descended into.
+
+    Args:
+        root: Directory to walk
+
+    Returns:
+        List of file paths
+    """
+    files = []
+    pending = deque([os.fspath(root)])
+    while pending:
+        with os.scandir(pending.popleft()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.path)
+    return files
+
+def fast_copy(src, dst, skip_unchanged: bool = False) -> bool:
+    """
+    Copy a file's contents and timestamps
+
+    shutil.copyfile already uses the OS fast path (sendfile on Linux, fcopyfile
+    on macOS) instead of a Python read/write loop. Only the timestamps are then
+    carried over with one utime call, rather than copy2's full copystat
+    (permissions, flags and extended attributes), which the package doesn't need.
+
+    Args:
+        src: Source file path
+        dst: Destination file path
+        skip_unchanged: Leave dst alone if it already has src's size and an
+            mtime at least as new (an rsync-style quick check)
+
+    Returns:
+        True if the file was copied, False if it was skipped as unchanged
+    """
+    st = os.stat(src)
+    if skip_unchanged:
+        try:
+            dst_st = os.stat(dst)
+            if dst_st.st_size == st.st_size and dst_st.st_mtime_ns >= st.st_mtime_ns:
+                return False
+        except FileNotFoundError:
+            pass
+    shutil.copyfile(src, dst)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return True
 
 def get_folder_last_modified(folder_path: Path) -> str:
     """
@@ -28,49 +125,197 @@ def get_folder_last_modified(folder_path: Path) -> str:
 
     latest_time = 0
 
-    # Check all files in this folder
-    for file_path in folder_path.rglob('*'):
-        if file_path.is_file():
-            try:
-                mtime = os.path.getmtime(file_path)
-                if mtime > latest_time:
-                    latest_time = mtime
-            except OSError:
-                continue
+    # Check all files in this folder and its subfolders, walking with an explicit stack;
+    # DirEntry gives the type from the listing, and the mtime comes from one lstat per
+    # file (cached from the listing on Windows) without resolving symlinks
+    stack = [folder_path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            mtime = entry.stat(follow_symlinks=False).st_mtime
+                            if mtime > latest_time:
+                                latest_time = mtime
+                    except OSError:
+                        continue
+        except OSError:
+            continue
 
     if latest_time == 0:
         return None
 
     return datetime.fromtimestamp(latest_time).strftime('%Y-%m-%d %H:%M:%S')
 
-def create_question_metadata(folderpath: Path) -> dict:
+def inspect_folder(folder: Path) -> dict:
+    """
+    List a question folder's files in a single directory scan
+
+    Args:
+        folder: Path to the question folder
+
+    Returns:
+        Dictionary with 'files' (set of file names in the folder) and
+        'images' (names of files starting with 'image', in scan order)
+    """
+    files = set()
+    images = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            # DirEntry.is_file uses the type from the directory listing, so this is not a stat per file
+            if entry.is_file():
+                files.add(entry.name)
+                if entry.name.startswith('image'):
+                    images.append(entry.name)
+    return {"files": files, "images": images}
+
+def package_images(contents: dict) -> list:
+    """
+    Pick the images that go into the upload package from an inspect_folder result
+
+    One pass over the scanned names, accepting the same formats the app imports.
+    """
+    return [name for name in contents["images"]
+            if name.startswith('image_') and os.path.splitext(name)[1] in IMAGE_SUFFIXES]
+
+def create_question_metadata(folderpath: Path, contents: dict = None) -> dict:
     """
     Create metadata for a question folder including last_update_date timestamp.
     
     Args:
         folderpath: Path to the question folder
+        contents: Result of inspect_folder for this folder, if the caller already has it
         
     Returns:
         Dictionary with metadata including last_update_date
     """
+    if contents is None:
+        contents = inspect_folder(folderpath)
+
     metadata = {
         "folder_name": folderpath.name,
         "last_update_date": get_folder_last_modified(folderpath) or datetime.now().strftime("%Y-%m-%d %H:%M:%S HKT")
     }
     
     # Check for HTML files
-    has_question = (folderpath / "summary_question.html").exists()
-    has_discussion = (folderpath / "summary_discussion_ai.html").exists()
-    metadata["has_question"] = has_question
-    metadata["has_discussion"] = has_discussion
+    metadata["has_question"] = "summary_question.html" in contents["files"]
+    metadata["has_discussion"] = "summary_discussion_ai.html" in contents["files"]
     
     # Count images
-    image_files = list(folderpath.glob("image*.png")) + list(folderpath.glob("image*.jpg"))
-    metadata["image_count"] = len(image_files)
+    metadata["image_count"] = len(package_images(contents))
     
     return metadata
 
-def create_upload_package(source_dir: str, output_dir: str = "upload_package", create_zip: bool = True):
+def process_question_folder(folder: Path, output_folder: Path = None, output_exists: bool = False) -> dict:
+    """
+    Copy one question folder into the upload package
+
+    Args:
+        folder: Source topic_X_question_Y folder
+        output_folder: Folder to create in the upload package, or None to only
+            collect the files (when the ZIP is written straight from the source)
+        output_exists: output_folder is already there from an earlier run, so it
+            isn't created again and files that haven't changed aren't recopied
+
+    Returns:
+        Dictionary with the folder's metadata, the names of its package files,
+        image count, whether it had a metadata.json, and its log lines
+        (printed by the caller, in order)
+    """
+    log = [f"Processing: {folder.name}"]
+    files = []
+    action = "Copied" if output_folder else "Added"
+
+    def copy_file(name: str):
+        """Copy one file into output_folder; returns the log verb, or None if it has gone missing"""
+        if not output_folder:
+            return action
+        # The folder scan is the only existence check; a file removed since then
+        # surfaces as FileNotFoundError from the copy itself
+        try:
+            copied = fast_copy(folder / name, output_folder / name, skip_unchanged=output_exists)
+        except FileNotFoundError:
+            return None
+        return "Copied" if copied else "Unchanged"
+
+    # Scan the folder once for both the metadata and the copies below
+    contents = inspect_folder(folder)
+
+    # Create metadata for this question
+    metadata = create_question_metadata(folder, contents)
+
+    # Create output folder
+    if output_folder and not output_exists:
+        output_folder.mkdir(exist_ok=True)
+
+    # Copy HTML files
+    for html_file in REQUIRED_FILES:
+        verb = copy_file(html_file) if html_file in contents["files"] else None
+        if verb:
+            files.append(html_file)
+            log.append(f"   ✓ {verb} {html_file}")
+        else:
+            log.append(f"   ⚠ Missing {html_file}")
+
+    # Copy metadata.json if exists
+    metadata_json = folder / 'metadata.json'
+    data = None
+    if 'metadata.json' in contents["files"]:
+        # Read the file once: the same bytes are copied and parsed for the timestamp.
+        # Like the other files, it may have been removed since the folder scan.
+        try:
+            st = os.stat(metadata_json)
+            data = metadata_json.read_bytes()
+        except FileNotFoundError:
+            pass
+    has_metadata_json = data is not None
+    if has_metadata_json:
+        if output_folder:
+            (output_folder / 'metadata.json').write_bytes(data)
+            os.utime(output_folder / 'metadata.json', ns=(st.st_atime_ns, st.st_mtime_ns))
+        files.append('metadata.json')
+        log.append(f"   ✓ {action} metadata.json")
+
+        # Try to read and show timestamp from metadata.json
+        try:
+            meta = parse_json_bytes(data)
+            if 'last_update_date' in meta:
+                log.append(f"   📅 {meta['last_update_date']}")
+        except:
+            pass
+    else:
+        log.append(f"   ⚠ Missing metadata.json")
+
+    # Copy image files, keeping only those that made it into the package
+    image_files = []
+    image_verbs = {}
+    for name in package_images(contents):
+        verb = copy_file(name)
+        if verb:
+            image_files.append(name)
+            image_verbs[verb] = image_verbs.get(verb, 0) + 1
+        else:
+            log.append(f"   ⚠ Missing {name}")
+    files.extend(image_files)
+    metadata["image_count"] = len(image_files)
+
+    for verb, count in image_verbs.items():
+        log.append(f"   ✓ {verb} {count} image(s)")
+
+    return {
+        "folder": folder,
+        "files": files,
+        "metadata": metadata,
+        "image_count": len(image_files),
+        "has_metadata_json": has_metadata_json,
+        "log": log
+    }
+
+def create_upload_package(source_dir: str, output_dir: str = "upload_package", create_zip: bool = True,
+                          zip_only: bool = False):
     """
     Prepare question folders for upload to NotJustExam
 
@@ -78,12 +323,16 @@ def create_upload_package(source_dir: str, output_dir: str = "upload_package", c
         source_dir: Directory containing your topic_X_question_Y folders
         output_dir: Directory to create the upload package
         create_zip: Automatically create ZIP file (default: True)
+        zip_only: Write the ZIP straight from the source files without creating
+            the output directory (default: False; requires create_zip)
     """
     source_path = Path(source_dir)
     output_path = Path(output_dir)
+    zip_only = zip_only and create_zip
 
     # Create output directory
-    output_path.mkdir(exist_ok=True)
+    if not zip_only:
+        output_path.mkdir(exist_ok=True)
 
     # Find all topic folders
     topic_folders = sorted([d for d in source_path.iterdir() 
@@ -103,70 +352,50 @@ def create_upload_package(source_dir: str, output_dir: str = "upload_package", c
     folders_with_metadata = 0
     folders_without_metadata = 0
 
-    # Process each folder
-    for folder in topic_folders:
-        folder_name = folder.name
-        print(f"Processing: {folder_name}")
-
-        # Create metadata for this question
-        metadata = create_question_metadata(folder)
-        metadata_list.append(metadata)
-
-        # Create output folder
-        output_folder = output_path / folder_name
-        output_folder.mkdir(exist_ok=True)
-
-        # Copy HTML files
-        for html_file in ['summary_question.html', 'summary_discussion_ai.html']:
-            source_file = folder / html_file
-            if source_file.exists():
-                shutil.copy2(source_file, output_folder / html_file)
-                print(f"   ✓ Copied {html_file}")
+    package_files = []
+
+    # Folders left by an earlier run of this package are updated in place
+    existing_dirs = set()
+    if not zip_only:
+        with os.scandir(output_path) as entries:
+            existing_dirs = {entry.name for entry in entries if entry.is_dir()}
+
+    # Process folders concurrently (the work is file I/O); results come back in
+    # folder order and each folder's log is printed in one piece
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(
+            lambda folder: process_question_folder(
+                folder, None if zip_only else output_path / folder.name, folder.name in existing_dirs
+            ),
+            topic_folders
+        )
+        for result in results:
+            # The folder's log and its trailing blank line go out in one write
+            print("\n".join(result["log"]), end="\n\n")
+            package_files.extend((result["folder"] / name, f"{result['folder'].name}/{name}") for name in result["files"])
+            metadata_list.append(result["metadata"])
+            total_images += result["image_count"]
+            if result["has_metadata_json"]:
+                folders_with_metadata += 1
             else:
-                print(f"   ⚠ Missing {html_file}")
-
-        # Copy metadata.json if exists
-        metadata_json = folder / 'metadata.json'
-        if metadata_json.exists():
-            shutil.copy2(metadata_json, output_folder / 'metadata.json')
-            print(f"   ✓ Copied metadata.json")
-            folders_with_metadata += 1
-
-            # Try to read and show timestamp from metadata.json
-            try:
-                with open(metadata_json, 'r', encoding='utf-8') as f:
-                    meta = json.load(f)
-                    if 'last_update_date' in meta:
-                        print(f"   📅 {meta['last_update_date']}")
-            except:
-                pass
-        else:
-            print(f"   ⚠ Missing metadata.json")
-            folders_without_metadata += 1
-
-        # Copy image files
-        image_files = list(folder.glob('image_*.png')) + list(folder.glob('image_*.jpg'))
-        for img_file in image_files:
-            shutil.copy2(img_file, output_folder / img_file.name)
-            total_images += 1
+                folders_without_metadata += 1
 
-        if image_files:
-            print(f"   ✓ Copied {len(image_files)} image(s)")
+            total_questions += 1
 
-        total_questions += 1
-        print()
+    package_metadata = {
+        "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "total_questions": total_questions,
+        "total_images": total_images,
+        "questions": metadata_list
+    }
 
     # Save metadata to JSON file in the output directory
-    metadata_file = output_path / 'upload_metadata.json'
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "total_questions": total_questions,
-            "total_images": total_images,
-            "questions": metadata_list
-        }, f, indent=2)
+    if not zip_only:
+        metadata_file = output_path / 'upload_metadata.json'
+        with open(metadata_file, 'wb') as f:
+            f.write(dump_json_bytes(package_metadata))
 
-    print(f"✅ Created root metadata file: upload_metadata.json")
+        print(f"✅ Created root metadata file: upload_metadata.json")
 
     print("=" * 50)
     print("✅ Package created successfully!")
@@ -175,7 +404,8 @@ def create_upload_package(source_dir: str, output_dir: str = "upload_package", c
     print(f"   - With metadata.json: {folders_with_metadata}")
     print(f"   - Without metadata.json: {folders_without_metadata}")
     print(f"   - Total images: {total_images}")
-    print(f"   - Output directory: {output_path.absolute()}")
+    if not zip_only:
+        print(f"   - Output directory: {output_path.absolute()}")
 
     if folders_without_metadata > 0:
         print(f"\n⚠️  WARNING: {folders_without_metadata} folders missing metadata.json")
@@ -188,7 +418,10 @@ def create_upload_package(source_dir: str, output_dir: str = "upload_package", c
     zip_path = None
     if create_zip:
         zip_name = f"{output_dir}.zip"
-        zip_path = create_zip_file(output_path, zip_name)
+        if zip_only:
+            zip_path = create_package_zip(package_files, package_metadata, output_path.name, zip_name)
+        else:
+            zip_path = create_zip_file(output_path, zip_name)
 
         if zip_path:
             print(f"✅ Created ZIP file: {zip_path}")
@@ -223,11 +456,41 @@ def create_zip_file(source_dir: Path, zip_name: str) -> str:
 
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             # Add all files maintaining folder structure
-            for file_path in source_dir.rglob('*'):
-                if file_path.is_file():
-                    # Create archive name relative to parent of source_dir
-                    arcname = file_path.relative_to(source_dir.parent)
-                    zipf.write(file_path, arcname)
+            for file_path in walk_files(source_dir):
+                # Create archive name relative to parent of source_dir
+                arcname = os.path.relpath(file_path, source_dir.parent)
+                write_zip_entry(zipf, file_path, arcname)
+
+        return str(zip_path.absolute())
+
+    except Exception as e:
+        print(f"❌ Error creating ZIP file: {str(e)}")
+        return None
+
+def create_package_zip(package_files: list, package_metadata: dict, package_name: str, zip_name: str) -> str:
+    """
+    Create the upload package ZIP directly from the source files
+
+    Produces the same archive layout as create_zip_file on a staged output
+    directory, without copying anything to disk first.
+
+    Args:
+        package_files: (source file path, path inside the package) pairs
+        package_metadata: Contents of the root upload_metadata.json
+        package_name: Top-level folder name inside the ZIP
+        zip_name: Name of output ZIP file
+
+    Returns:
+        Path to created ZIP file
+    """
+    try:
+        zip_path = Path(zip_name)
+
+        with zipfile.ZipFile(zip_path, 'w') as zipf:
+            for file_path, arcname in package_files:
+                write_zip_entry(zipf, file_path, f"{package_name}/{arcname}")
+            zipf.writestr(f"{package_name}/upload_metadata.json", dump_json_bytes(package_metadata),
+                          compress_type=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL)
 
         return str(zip_path.absolute())
 
@@ -250,30 +513,28 @@ def validate_folder_structure(folder_path: str) -> bool:
         errors.append("Folder name must start with 'topic_'")
     else:
         # Validate naming pattern
-        import re
-        if not re.match(r'topic_\d+_question_\d+', folder.name):
+        if not FOLDER_NAME_RE.match(folder.name):
             errors.append("Folder name must follow pattern: topic_X_question_Y")
 
-    # Check required files
-    required_files = ['summary_question.html', 'summary_discussion_ai.html']
+    contents = inspect_folder(folder)
 
-    for req_file in required_files:
-        file_path = folder / req_file
-        if not file_path.exists():
+    # Check required files
+    for req_file in REQUIRED_FILES:
+        if req_file not in contents["files"]:
             errors.append(f"Missing required file: {req_file}")
         else:
             print(f"✓ Found: {req_file}")
             # Validate file is not empty
-            if os.path.getsize(file_path) == 0:
+            if os.path.getsize(folder / req_file) == 0:
                 warnings.append(f"{req_file} is empty")
 
     # Check for metadata.json
     metadata_json = folder / 'metadata.json'
-    if metadata_json.exists():
+    has_metadata_json = 'metadata.json' in contents["files"]
+    if has_metadata_json:
         print(f"✓ Found: metadata.json")
         try:
-            with open(metadata_json, 'r', encoding='utf-8') as f:
-                meta = json.load(f)
+            meta = parse_json_bytes(metadata_json.read_bytes())
             if 'last_update_date' in meta:
                 print(f"  📅 {meta['last_update_date']}")
             else:
@@ -284,19 +545,19 @@ def validate_folder_structure(folder_path: str) -> bool:
         warnings.append("metadata.json not found - timestamps may not work correctly")
 
     # Check for images
-    image_files = list(folder.glob('image_*.*'))
+    image_files = [name for name in contents["images"] if name.startswith('image_') and '.' in name[len('image_'):]]
     if image_files:
         print(f"✓ Found {len(image_files)} image(s)")
         # Validate image naming
-        for img in image_files:
-            if not (img.suffix.lower() in ['.png', '.jpg', '.jpeg']):
-                warnings.append(f"Unsupported image format: {img.name}")
+        for name in image_files:
+            if Path(name).suffix.lower() not in IMAGE_SUFFIXES:
+                warnings.append(f"Unsupported image format: {name}")
     else:
         warnings.append("No images found (optional)")
 
     # Get and display last_updated (fallback method)
     last_updated = get_folder_last_modified(folder)
-    if last_updated and not metadata_json.exists():
+    if last_updated and not has_metadata_json:
         print(f"📅 Last modified: {last_updated}")
 
     # Report results
@@ -406,37 +667,41 @@ def create_zip_from_existing(source_dir: str, zip_name: str = None) -> str:
         metadata_list = []
         folders_with_metadata = 0
 
-        for folder in topic_folders:
-            metadata = create_question_metadata(folder)
-            metadata_list.append(metadata)
+        def scan_folder(folder):
+            contents = inspect_folder(folder)
+            return create_question_metadata(folder, contents), 'metadata.json' in contents["files"]
 
-            # Check if metadata.json exists
-            if (folder / 'metadata.json').exists():
-                folders_with_metadata += 1
+        # Folders are scanned concurrently; map keeps the metadata in folder order
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for metadata, has_metadata_json in executor.map(scan_folder, topic_folders):
+                metadata_list.append(metadata)
+
+                # Check if metadata.json exists
+                if has_metadata_json:
+                    folders_with_metadata += 1
 
         # Create temporary metadata file at root
         temp_metadata = source_path / 'upload_metadata.json'
-        with open(temp_metadata, 'w', encoding='utf-8') as f:
-            json.dump({
+        with open(temp_metadata, 'wb') as f:
+            f.write(dump_json_bytes({
                 "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 "total_questions": len(topic_folders),
                 "questions": metadata_list
-            }, f, indent=2)
+            }))
 
         with zipfile.ZipFile(zip_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
             file_count = 0
 
             for folder in topic_folders:
                 # Add all files from this folder (including metadata.json if present)
-                for file_path in folder.rglob('*'):
-                    if file_path.is_file():
-                        # Create archive path: topic_X_question_Y/filename
-                        arcname = file_path.relative_to(source_path)
-                        zipf.write(file_path, arcname)
-                        file_count += 1
+                for file_path in walk_files(folder):
+                    # Create archive path: topic_X_question_Y/filename
+                    arcname = os.path.relpath(file_path, source_path)
+                    write_zip_entry(zipf, file_path, arcname)
+                    file_count += 1
 
             # Add root metadata file
-            zipf.write(temp_metadata, 'upload_metadata.json')
+            write_zip_entry(zipf, temp_metadata, 'upload_metadata.json')
             file_count += 1
 
         # Remove temporary metadata file